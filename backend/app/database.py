@@ -1,17 +1,144 @@
+import time
+from typing import Any, Dict, Optional
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.config import settings
+from app.utils.metrics import metrics
+
+POOL_WAIT_MS_BUCKETS = [0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000, 30000]
+
+class PoolInstrumentation:
+    """Checkout wait time, connections in use and pool timeouts of one engine's pool"""
+
+    def __init__(self, prefix: str):
+        self.wait_ms = metrics.histogram(f"{prefix}_checkout_wait_ms", POOL_WAIT_MS_BUCKETS, "Time spent waiting for a pooled connection")
+        self.in_use = metrics.gauge(f"{prefix}_in_use", "Pooled connections checked out")
+        self.overflow = metrics.gauge(f"{prefix}_overflow", "Connections open beyond the pool size")
+        self.timeouts = metrics.counter(f"{prefix}_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT")
+
+    def pool_class(self, base):
+        """Subclass of a queue pool class that reports to these metrics"""
+        instrumentation = self
+
+        class InstrumentedPool(base):
+            def _do_get(self):
+                started = time.perf_counter()
+                try:
+                    connection = super()._do_get()
+                except PoolTimeoutError:
+                    instrumentation.timeouts.inc()
+                    raise
+                finally:
+                    instrumentation.wait_ms.observe((time.perf_counter() - started) * 1000.0)
+                instrumentation.update(self)
+                return connection
+
+            def _do_return_conn(self, record):
+                super()._do_return_conn(record)
+                instrumentation.update(self)
+
+        return InstrumentedPool
+
+    def update(self, pool):
+        self.in_use.set(pool.checkedout())
+        self.overflow.set(max(0, pool.overflow()))
+
+def _in_memory(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+def _engine_options(database_url: str, pool_base, instrumentation: PoolInstrumentation) -> Dict[str, Any]:
+    """Pool settings for create_engine (in-memory SQLite keeps its single-connection pool)"""
+    url = make_url(database_url)
+    options: Dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if _in_memory(url):
+        return options
+    options.update(
+        poolclass=instrumentation.pool_class(pool_base),
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE
+    )
+    return options
+
+def async_database_url(database_url: str) -> str:
+    """The async driver URL for a sync one (asyncpg for PostgreSQL, aiosqlite for SQLite)"""
+    url = make_url(database_url)
+    driver = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver known for {url.get_backend_name()}, set DB_ASYNC_URL")
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}").render_as_string(hide_password=False)
 
 # Create SQLAlchemy engine
-engine = create_engine(settings.DATABASE_URL)
+pool_instrumentation = PoolInstrumentation("db_pool")
+engine = create_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL, QueuePool, pool_instrumentation))
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Sessions driven from async routes through the threadpool; attributes stay
+# loaded after commit so nothing lazy-loads on the event loop afterwards
+ThreadedSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+
+# Optional async engine (asyncpg / aiosqlite), DB_ASYNC_ENABLED
+async_engine = None
+AsyncSessionLocal = None
+async_pool_instrumentation: Optional[PoolInstrumentation] = None
+if settings.DB_ASYNC_ENABLED:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_url = settings.DB_ASYNC_URL or async_database_url(settings.DATABASE_URL)
+    async_pool_instrumentation = PoolInstrumentation("db_async_pool")
+    async_engine = create_async_engine(async_url, **_engine_options(async_url, AsyncAdaptedQueuePool, async_pool_instrumentation))
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Create Base class for models
 Base = declarative_base()
 
+class ThreadedSession:
+    """
+    AsyncSession-compatible wrapper running a sync Session in the threadpool
+
+    Lets async routes be written once against the AsyncSession API: with
+    DB_ASYNC_ENABLED they get a real AsyncSession, otherwise this wrapper,
+    and either way the event loop never waits on the database.
+    """
+
+    def __init__(self, session):
+        self.sync_session = session
+
+    async def execute(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, *args, **kwargs)
+
+    async def scalars(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalars, statement, *args, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def refresh(self, instance, *args, **kwargs):
+        await run_in_threadpool(self.sync_session.refresh, instance, *args, **kwargs)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
@@ -19,3 +146,33 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency to get a non-blocking DB session for async routes
+async def get_async_db():
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
+    db = ThreadedSession(ThreadedSessionLocal())
+    try:
+        yield db
+    finally:
+        await db.close()
+
+def pool_stats() -> Dict:
+    """Connection pool usage of the sync (and async) engines"""
+    def describe(pool) -> Dict:
+        if not hasattr(pool, "checkedout"):
+            return {"class": type(pool).__name__}
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(0, pool.overflow()),
+            "idle": pool.checkedin()
+        }
+
+    return {
+        "sync": describe(engine.pool),
+        "async": describe(async_engine.sync_engine.pool) if async_engine is not None else None
+    }
@@ -1,4 +1,5 @@
 from .user import User, UserRole, UserStatus
-from .anomaly import Anomaly
+from .anomaly import Anomaly, AnomalyRollup
+from .email_outbox import EmailOutbox
 
-__all__ = ["User", "UserRole", "UserStatus", "Anomaly"]
+__all__ = ["User", "UserRole", "UserStatus", "Anomaly", "AnomalyRollup", "EmailOutbox"]
@@ -1,13 +1,52 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from app.database import Base
+from app.config import settings
+
+# On PostgreSQL the anomalies table is range-partitioned by detected_at
+# (see app/utils/anomaly_storage.py). The partition key has to be part of the
+# primary key there; other dialects (SQLite in tests) keep a single heap.
+PARTITIONED = settings.ANOMALY_PARTITIONING and settings.DATABASE_URL.startswith("postgresql")
 
 class Anomaly(Base):
     __tablename__ = "anomalies"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     node_id = Column(String, nullable=False)
     confidence = Column(Float, nullable=False)
-    detected_at = Column(DateTime(timezone=True), server_default=func.now())
+    detected_at = Column(DateTime(timezone=True), server_default=func.now(), primary_key=PARTITIONED, nullable=False)
     is_resolved = Column(Boolean, default=False)
     severity = Column(String, default="medium")  # low, medium, high, critical
+    
+    # All list queries order by (detected_at, id) descending, so every index
+    # ends in those columns and a page is a bounded index range scan
+    __table_args__ = (
+        Index("ix_anomalies_detected_at_id", detected_at, id),
+        # Partial index for the default dashboard query (unresolved, newest first)
+        Index(
+            "ix_anomalies_unresolved_detected_at",
+            detected_at,
+            id,
+            postgresql_where=(is_resolved == False),
+            sqlite_where=(is_resolved == False)
+        ),
+        Index("ix_anomalies_node_detected_at", node_id, detected_at, id),
+        Index("ix_anomalies_severity_detected_at", severity, detected_at, id),
+        {"postgresql_partition_by": "RANGE (detected_at)"} if PARTITIONED else {},
+    )
+
+class AnomalyRollup(Base):
+    """Pre-aggregated anomaly counts per time bucket, node and severity"""
+    __tablename__ = "anomaly_rollups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    granularity = Column(String, nullable=False)  # hour, day
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    node_id = Column(String, nullable=False)
+    severity = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        UniqueConstraint("granularity", "bucket_start", "node_id", "severity", name="uq_anomaly_rollups_bucket"),
+        Index("ix_anomaly_rollups_granularity_bucket", "granularity", "bucket_start"),
+    )
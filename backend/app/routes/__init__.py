@@ -1,5 +1,15 @@
-from .auth import router as auth_router
-from .admin import router as admin_router
-from .model import router as model_router
+# Routers are imported on first access, so importing one route module
+# (e.g. app.routes.auth) does not pull in the inference and storage stacks
+_ROUTERS = {
+    "auth_router": "auth",
+    "admin_router": "admin",
+    "model_router": "model",
+}
 
-__all__ = ["auth_router", "admin_router", "model_router"]
+__all__ = list(_ROUTERS)
+
+def __getattr__(name):
+    if name in _ROUTERS:
+        from importlib import import_module
+        return import_module(f".{_ROUTERS[name]}", __name__).router
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,16 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import User, UserStatus, UserRole
-from app.schemas import UserResponse, UserApprovalRequest
-from app.utils.auth import decode_access_token
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select
+from app.database import get_async_db, pool_stats
+from app.models import User, UserStatus
+from app.schemas import UserResponse, UserApprovalRequest, ModelLoadRequest
+from app.utils.admin_cache import admin_cache, PENDING_USERS, USER_COUNTS
+from app.utils.principal import Principal, get_current_admin, principal_cache
 from app.utils.email_service import email_service
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.utils.email_dispatcher import email_dispatcher
+from app.utils.analytics import detection_analytics
+from app.utils.model_registry import model_registry, FAILED, READY
+from app.utils.result_cache import result_cache
+from app.utils.password_hasher import password_hasher
+from app.config import settings
 from typing import List, Optional
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
-security = HTTPBearer()
 
 
 class UserApprovalRequestExtended(BaseModel):
@@ -18,60 +24,31 @@ class UserApprovalRequestExtended(BaseModel):
     approved: bool
     rejection_reason: Optional[str] = None
 
-def get_current_admin(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-):
-    """Verify admin user from JWT token"""
-    token = credentials.credentials
-    payload = decode_access_token(token)
-    
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials"
-        )
-    
-    email = payload.get("sub")
-    role = payload.get("role")
-    
-    if role != UserRole.ADMIN.value:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to access admin resources"
-        )
-    
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
-    return user
-
 @router.get("/pending-users", response_model=List[UserResponse])
 async def get_pending_users(
-    db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    db=Depends(get_async_db),
+    admin: Principal = Depends(get_current_admin)
 ):
     """Get all pending user registration requests (only email-verified users)"""
-    pending_users = db.query(User).filter(
-        User.status == UserStatus.PENDING,
-        User.email_verified == True
-    ).all()
-    return pending_users
+    async def load():
+        pending_users = await db.scalars(select(User).where(
+            User.status == UserStatus.PENDING,
+            User.email_verified == True
+        ))
+        return [UserResponse.model_validate(user).model_dump(mode="json") for user in pending_users.all()]
+    
+    return await admin_cache.get_or_load(PENDING_USERS, load)
 
 
 @router.post("/approve-user")
 async def approve_user(
     request: UserApprovalRequestExtended,
-    db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    db=Depends(get_async_db),
+    admin: Principal = Depends(get_current_admin)
 ):
     """Approve or decline a user registration"""
     
-    user = db.query(User).filter(User.id == request.user_id).first()
+    user = await db.get(User, request.user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -83,8 +60,9 @@ async def approve_user(
         user.is_active = True
         message = "User approved successfully"
         
-        # Send approval email notification
-        email_service.send_approval_email(
+        # Queue approval email notification (sent in the background)
+        email_service.queue_approval_email(
+            db,
             to_email=user.email,
             user_name=user.name
         )
@@ -93,34 +71,109 @@ async def approve_user(
         user.is_active = False
         message = "User declined"
         
-        # Send rejection email notification
-        email_service.send_rejection_email(
+        # Queue rejection email notification (sent in the background)
+        email_service.queue_rejection_email(
+            db,
             to_email=user.email,
             user_name=user.name,
             reason=request.rejection_reason
         )
     
-    db.commit()
+    await db.commit()
+    # Cached principals and dashboard reads must not outlive a status change
+    await principal_cache.invalidate(user.email)
+    await admin_cache.invalidate_users()
+    email_dispatcher.notify()
     
     return {"message": message, "user_id": user.id, "status": user.status}
 
 @router.get("/analytics")
 async def get_analytics(
-    db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    db=Depends(get_async_db),
+    admin: Principal = Depends(get_current_admin)
 ):
     """Get system analytics"""
     
-    total_users = db.query(User).count()
-    active_users = db.query(User).filter(User.is_active == True).count()
-    pending_users = db.query(User).filter(User.status == UserStatus.PENDING).count()
+    async def load_counts():
+        total, active, pending = (await db.execute(select(
+            func.count(User.id),
+            func.count(User.id).filter(User.is_active == True),
+            func.count(User.id).filter(User.status == UserStatus.PENDING)
+        ))).one()
+        return {"total_users": total, "active_users": active, "pending_users": pending}
+    
+    counts = await admin_cache.get_or_load(USER_COUNTS, load_counts)
     
-    # TODO: Add anomaly frequency and system health metrics
+    # Detection statistics come from in-memory sliding windows, not table scans;
+    # one snapshot feeds both the detection fields and the health verdict
+    detection = detection_analytics.snapshot()
     
     return {
-        "total_users": total_users,
-        "active_users": active_users,
-        "pending_users": pending_users,
-        "anomaly_frequency": 0,  # Placeholder
-        "system_health": "Good"  # Placeholder
+        "total_users": counts["total_users"],
+        "active_users": counts["active_users"],
+        "pending_users": counts["pending_users"],
+        "anomalies_today": detection["anomalies"]["24h"],
+        "anomaly_frequency": detection["anomaly_rate_per_minute"]["1h"],
+        "system_health": detection_analytics.system_health(settings.ANALYTICS_LATENCY_BUDGET_MS, detection),
+        "detection": detection,
+        "result_cache": result_cache.stats() if result_cache is not None else None,
+        "password_hashing": password_hasher.stats(),
+        "database_pool": pool_stats(),
+        "admin_cache": admin_cache.stats(),
+        "email": email_dispatcher.stats()
     }
+
+@router.get("/models")
+async def get_models(admin: Principal = Depends(get_current_admin)):
+    """Active model version, rollback history and load/warmup times of loaded versions"""
+    return model_registry.status()
+
+def _load_model_version(version: str, path: str, activate: bool):
+    """Background task: load and warm up a version, then swap it in if requested"""
+    entry = model_registry.load(version, path)
+    if activate and entry.status == READY:
+        model_registry.activate(version)
+
+@router.post("/models", status_code=status.HTTP_202_ACCEPTED)
+async def load_model_version(
+    request: ModelLoadRequest,
+    background_tasks: BackgroundTasks,
+    admin: Principal = Depends(get_current_admin)
+):
+    """
+    Load a checkpoint (relative to MODEL_REGISTRY_DIR) as a new version
+    
+    Loading and warmup run in the background while the current version keeps
+    serving; poll GET /admin/models for the outcome.
+    """
+    try:
+        path = model_registry.resolve_path(request.path)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    existing = model_registry.get(request.version)
+    if existing is not None and existing.status != FAILED:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Model version already exists")
+    
+    background_tasks.add_task(_load_model_version, request.version, path, request.activate)
+    return {"message": "Model version loading", "version": request.version}
+
+@router.post("/models/{version}/activate")
+async def activate_model_version(version: str, admin: Principal = Depends(get_current_admin)):
+    """Swap a loaded version in for serving"""
+    try:
+        entry = await run_in_threadpool(model_registry.activate, version)
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Model version not found")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return entry.to_dict()
+
+@router.post("/models/rollback")
+async def rollback_model_version(admin: Principal = Depends(get_current_admin)):
+    """Swap back to the previously active version"""
+    try:
+        entry = await run_in_threadpool(model_registry.rollback)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return entry.to_dict()
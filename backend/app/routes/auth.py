@@ -1,17 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select
+from app.database import get_async_db
 from app.models import User, UserStatus, UserRole
 from app.schemas import UserCreate, UserLogin, Token, UserResponse
-from app.utils.auth import verify_password, get_password_hash, create_access_token
+from app.utils.auth import needs_rehash, create_access_token
+from app.utils.password_hasher import password_hasher, HasherSaturatedError
 from app.utils.email_service import email_service
+from app.utils.email_dispatcher import email_dispatcher
+from app.utils.admin_cache import admin_cache
 from datetime import timedelta, datetime, timezone
 from app.config import settings
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+def _hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-ins at the moment, please retry shortly",
+        headers={"Retry-After": "1"}
+    )
+
 @router.post("/signup", response_model=UserResponse)
-async def signup(user: UserCreate, db: Session = Depends(get_db)):
+async def signup(user: UserCreate, db=Depends(get_async_db)):
     """Register a new user"""
     
     # Validate password confirmation
@@ -22,7 +32,7 @@ async def signup(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Check if employee ID already exists
-    existing_user = db.query(User).filter(User.employee_id == user.employee_id).first()
+    existing_user = await db.scalar(select(User).where(User.employee_id == user.employee_id))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -30,7 +40,7 @@ async def signup(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Check if email already exists
-    existing_email = db.query(User).filter(User.email == user.email).first()
+    existing_email = await db.scalar(select(User).where(User.email == user.email))
     if existing_email:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -41,8 +51,11 @@ async def signup(user: UserCreate, db: Session = Depends(get_db)):
     verification_token = email_service.generate_verification_token()
     verification_expires = datetime.now(timezone.utc) + timedelta(hours=24)
     
-    # Create new user
-    hashed_password = get_password_hash(user.password)
+    # Create new user (bcrypt runs on the hashing pool, off the event loop)
+    try:
+        hashed_password = await password_hasher.hash(user.password)
+    except HasherSaturatedError:
+        raise _hashing_busy()
     db_user = User(
         name=user.name,
         employee_id=user.employee_id,
@@ -57,24 +70,26 @@ async def signup(user: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    
-    # Send verification email
-    email_service.send_verification_email(
+    # Queue the verification email in the same transaction; it is sent in the background
+    email_service.queue_verification_email(
+        db,
         to_email=user.email,
         user_name=user.name,
         token=verification_token
     )
+    await db.commit()
+    await db.refresh(db_user)
+    await admin_cache.invalidate_users()
+    email_dispatcher.notify()
     
     return db_user
 
 
 @router.post("/verify-email")
-async def verify_email(token: str, db: Session = Depends(get_db)):
+async def verify_email(token: str, db=Depends(get_async_db)):
     """Verify user's email address"""
     
-    user = db.query(User).filter(User.email_verification_token == token).first()
+    user = await db.scalar(select(User).where(User.email_verification_token == token))
     
     if not user:
         raise HTTPException(
@@ -95,16 +110,18 @@ async def verify_email(token: str, db: Session = Depends(get_db)):
     user.email_verified = True
     user.email_verification_token = None
     user.email_verification_expires = None
-    db.commit()
+    await db.commit()
+    # The user now shows up in the admin's pending list
+    await admin_cache.invalidate_users()
     
     return {"message": "Email verified successfully. Please wait for admin approval."}
 
 
 @router.post("/resend-verification")
-async def resend_verification_email(email: str, db: Session = Depends(get_db)):
+async def resend_verification_email(email: str, db=Depends(get_async_db)):
     """Resend verification email"""
     
-    user = db.query(User).filter(User.email == email).first()
+    user = await db.scalar(select(User).where(User.email == email))
     
     if not user:
         # Don't reveal if email exists
@@ -122,31 +139,46 @@ async def resend_verification_email(email: str, db: Session = Depends(get_db)):
     
     user.email_verification_token = verification_token
     user.email_verification_expires = verification_expires
-    db.commit()
     
-    # Send verification email
-    email_service.send_verification_email(
+    # Queue verification email
+    email_service.queue_verification_email(
+        db,
         to_email=user.email,
         user_name=user.name,
         token=verification_token
     )
+    await db.commit()
+    email_dispatcher.notify()
     
     return {"message": "If the email exists, a verification link has been sent."}
 
 
 @router.post("/login", response_model=Token)
-async def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, db=Depends(get_async_db)):
     """Login user and return JWT token"""
     
     # Find user by email
-    user = db.query(User).filter(User.email == credentials.email).first()
+    user = await db.scalar(select(User).where(User.email == credentials.email))
     
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    try:
+        verified = user is not None and await password_hasher.verify(credentials.password, user.hashed_password)
+    except HasherSaturatedError:
+        raise _hashing_busy()
+    
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
+    # Upgrade hashes made with another bcrypt cost while the plain password is at hand
+    if needs_rehash(user.hashed_password):
+        try:
+            user.hashed_password = await password_hasher.hash(credentials.password)
+            await db.commit()
+        except HasherSaturatedError:
+            pass  # Upgraded on a later login
+    
     # Check if email is verified
     if not user.email_verified:
         raise HTTPException(
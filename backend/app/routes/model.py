@@ -1,87 +1,447 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.schemas import PredictionRequest, PredictionResponse, AnomalyResponse
-from app.utils.model_loader import model_inference
-from app.models import Anomaly
-from datetime import datetime
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, WebSocket, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_, select
+from app.config import settings
+from app.database import get_async_db
+from app.schemas import (
+    PredictionRequest, PredictionResponse, AnomalyResponse, AnomalyRollupResponse,
+    BatchPredictionRequest, BatchPredictionResponse, WindowPredictionRequest, WindowPredictionResponse,
+    ReplayRequest, ReplayResponse
+)
+from app.utils.batcher import create_batcher
+from app.utils.executor import inference_pool, PoolSaturatedError
+from app.utils.stream import create_stream_session
+from app.utils.events import event_hub
+from app.utils.anomaly_writer import create_anomaly_writer
+from app.utils.analytics import detection_analytics
+from app.utils.topology import topology_registry
+from app.utils.feature_schema import DEFAULT_MODEL_PATH, FeatureSchema
+from app.utils.model_registry import model_registry
+from app.utils.result_cache import result_cache
+from app.utils.windowing import create_window_manager
+from app.utils.gating import create_change_gate
+from app.utils.feature_store import META_FILE, FeatureStore
+from app.utils.principal import require_model_auth
+from app.models import Anomaly, AnomalyRollup
+from datetime import datetime, timezone
+from typing import Awaitable, List, Optional, Tuple
+import os
+import time
 
-router = APIRouter(prefix="/model", tags=["Model"])
+# Every /model route (the stream and event feed included) authenticates
+# through the cached principal when MODEL_AUTH_REQUIRED is set
+router = APIRouter(prefix="/model", tags=["Model"], dependencies=[Depends(require_model_auth)])
+
+async def _recorded(scoring: Awaitable[List[dict]]) -> List[dict]:
+    """Await a scoring task on the inference pool and feed the detection analytics"""
+    started = time.perf_counter()
+    try:
+        results = await scoring
+    except Exception:
+        detection_analytics.record_error()
+        raise
+    detection_analytics.record_batch(results, (time.perf_counter() - started) * 1000.0)
+    return results
+
+async def _score_cached(frames: List[dict]) -> List[dict]:
+    """Answer repeated frames from the result cache and score only the rest"""
+    active = model_registry.active
+    # Frames are packed here in both states, so a frame scores (or fails) the
+    # same way before and after the first model is active
+    schema = active.model.schema if active is not None else default_schema
+    packed = schema.pack(frames)
+    if active is None:
+        # Model still loading: the pool loads the default checkpoint on first
+        # use, no version to key the cache on yet
+        return await inference_pool.predict_packed(packed.copy())
+    
+    keys = result_cache.keys(packed, active.version)
+    results = result_cache.get_many(keys)
+    
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        # Fancy indexing copies out of the event loop thread's pack buffer
+        scored = await inference_pool.predict_packed(packed[missing])
+        for i, result in zip(missing, scored):
+            result_cache.put(keys[i], result)
+            results[i] = dict(result)
+    return results
+
+async def _predict_batch(frames: List[dict]) -> List[dict]:
+    """Score independent sensor frames"""
+    if result_cache is None:
+        return await _recorded(inference_pool.predict_batch(frames))
+    return await _recorded(_score_cached(frames))
+
+# Per-stream sliding windows and gate references live in this process so
+# every frame of a stream updates the same state, whichever worker scores it
+default_schema = FeatureSchema.for_checkpoint(DEFAULT_MODEL_PATH)
+window_manager = create_window_manager(default_schema)
+change_gate = create_change_gate(default_schema)
+
+def _on_model_activated(entry):
+    """Follow a model swap: new process workers, the new model's feature schema, no cached verdicts"""
+    inference_pool.reload(entry.path)
+    window_manager.set_schema(entry.model.schema)
+    change_gate.set_schema(entry.model.schema)
+    if result_cache is not None:
+        result_cache.clear()
+
+model_registry.on_activate(_on_model_activated)
+
+async def _predict_windowed(frames: List[dict]) -> List[dict]:
+    """Score frames on their stream's window features (frames carry stream_id and sensor_data)"""
+    features, summaries = window_manager.update(
+        [(frame.get("stream_id") or "default", frame["sensor_data"]) for frame in frames]
+    )
+    results = await _recorded(inference_pool.predict_packed(features))
+    for result, summary in zip(results, summaries):
+        result["window"] = summary
+    return results
+
+async def _predict_gated(frames: List[dict]) -> List[dict]:
+    """Score only frames that changed since their stream's last scored frame, reuse verdicts for the rest"""
+    plan = change_gate.plan(
+        [(frame.get("stream_id") or "default", frame["sensor_data"]) for frame in frames]
+    )
+    scored = []
+    if plan.score_rows:
+        try:
+            scored = await _predict_batch([frames[i]["sensor_data"] for i in plan.score_rows])
+        except BaseException:
+            change_gate.abort(plan)
+            raise
+    return change_gate.complete(plan, scored)
+
+# Concurrent /predict calls share forward passes through the micro-batcher
+# and every forward pass runs on the inference pool, off the event loop
+batcher = create_batcher(_predict_batch)
+
+def _anomaly_rows(results: List[dict]) -> List[dict]:
+    """Build Anomaly rows from prediction results, stamped with the detection time"""
+    detected_at = datetime.now(timezone.utc)
+    return [
+        {
+            "node_id": anomaly_data["node_id"],
+            "confidence": anomaly_data["confidence"],
+            "severity": anomaly_data.get("severity", "medium"),
+            "detected_at": detected_at
+        }
+        for result in results
+        for anomaly_data in result["anomalies"]
+    ]
+
+def _set_node_status(node_id: str, status: str):
+    """Update live topology status and notify dashboards only on a change"""
+    if topology_registry.set_status(node_id, status):
+        event_hub.publish("node_status", {"node_id": node_id, "status": status})
+
+def _publish_anomalies(stored: List[dict]):
+    """Push new anomalies and the resulting node status changes to dashboards"""
+    for anomaly in stored:
+        event_hub.publish("anomaly", anomaly)
+        _set_node_status(anomaly["node_id"], "anomaly")
+
+# Detections are written behind the request path in bulk; dashboards are
+# notified once the rows (and their ids) are stored
+anomaly_writer = create_anomaly_writer(on_flush=_publish_anomalies)
 
 @router.post("/predict", response_model=PredictionResponse)
-async def predict_anomalies(request: PredictionRequest, db: Session = Depends(get_db)):
+async def predict_anomalies(request: PredictionRequest):
     """
     Make predictions using the trained DQN-GNN model
     """
     try:
-        # Get predictions from model
-        result = model_inference.predict(request.sensor_data)
+        # Get predictions from model (batched with concurrent requests)
+        result = await batcher.submit(request.sensor_data)
         
-        # Store detected anomalies in database
-        for anomaly_data in result["anomalies"]:
-            anomaly = Anomaly(
-                node_id=anomaly_data["node_id"],
-                confidence=anomaly_data["confidence"],
-                severity=anomaly_data.get("severity", "medium")
-            )
-            db.add(anomaly)
+        # Queue detected anomalies for the write-behind buffer
+        anomaly_writer.enqueue(_anomaly_rows([result]))
+        
+        return {
+            "anomalies": result["anomalies"],
+            "topology": result["topology"],
+            "timestamp": datetime.utcnow()
+        }
+    except PoolSaturatedError:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Inference capacity exhausted, retry later"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_anomalies_batch(request: BatchPredictionRequest):
+    """
+    Make predictions for several sensor frames in one forward pass
+    """
+    try:
+        results = await _predict_batch(request.frames)
+        
+        anomaly_writer.enqueue(_anomaly_rows(results))
+        
+        timestamp = datetime.utcnow()
+        return {
+            "predictions": [
+                {
+                    "anomalies": result["anomalies"],
+                    "topology": result["topology"],
+                    "timestamp": timestamp
+                }
+                for result in results
+            ]
+        }
+    except PoolSaturatedError:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Inference capacity exhausted, retry later"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/predict/window", response_model=WindowPredictionResponse)
+async def predict_anomalies_windowed(request: WindowPredictionRequest):
+    """
+    Score a frame on the sliding window of its stream
+    
+    The model sees the rolling mean of the stream's last WINDOW_SIZE frames,
+    and the response reports the tags drifting the most across the window.
+    """
+    try:
+        result = (await _predict_windowed([request.model_dump()]))[0]
         
-        db.commit()
+        anomaly_writer.enqueue(_anomaly_rows([result]))
         
         return {
             "anomalies": result["anomalies"],
             "topology": result["topology"],
+            "window": result["window"],
             "timestamp": datetime.utcnow()
         }
+    except PoolSaturatedError:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Inference capacity exhausted, retry later"
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Rows scored per inference pool task when replaying stored history
+REPLAY_CHUNK_ROWS = 4096
+
+# Open store and the meta.json version (mtime, size, inode) it was opened at
+_feature_store: Optional[Tuple[Tuple[int, int, int], FeatureStore]] = None
+
+def _open_feature_store() -> FeatureStore:
+    """
+    Open the configured feature store (blocking, call in the threadpool)
+    
+    Memory maps are shared by every replay; the store is reopened once an
+    import publishes new rows (meta.json is replaced on every commit).
+    """
+    global _feature_store
+    if not settings.FEATURE_STORE_DIR:
+        raise HTTPException(status_code=404, detail="No feature store configured")
+    try:
+        meta = os.stat(os.path.join(settings.FEATURE_STORE_DIR, META_FILE))
+        version = (meta.st_mtime_ns, meta.st_size, meta.st_ino)
+        if _feature_store is None or _feature_store[0] != version:
+            _feature_store = (version, FeatureStore(settings.FEATURE_STORE_DIR))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Feature store not found")
+    return _feature_store[1]
+
+def _replay_chunk(store: FeatureStore, schema: FeatureSchema, chunk: slice, windowed: bool):
+    """Model inputs and timestamps of a replay chunk (reads the memory maps, call in the threadpool)"""
+    if windowed:
+        inputs = store.windowed(schema, chunk, settings.WINDOW_SIZE)
+    else:
+        inputs = store.packed(schema, chunk)
+    return inputs, store.timestamps[chunk].astype("datetime64[ns]").astype("datetime64[us]").tolist()
+
+@router.post("/replay", response_model=ReplayResponse)
+async def replay_history(request: ReplayRequest):
+    """
+    Score a time range of stored sensor history and return the flagged frames
+    
+    Rows are sliced straight from the memory-mapped feature store, so no
+    JSON frames are built. With windowed=true the model sees the same
+    sliding-window features as /model/predict/window. Slicing and packing
+    run in the threadpool, never on the event loop. Replays are for
+    evaluation: nothing is persisted or counted in the detection analytics.
+    """
+    store = await run_in_threadpool(_open_feature_store)
+    rows = await run_in_threadpool(store.time_slice, request.start, request.end)
+    if rows.stop - rows.start > settings.REPLAY_MAX_ROWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range has {rows.stop - rows.start} rows, at most {settings.REPLAY_MAX_ROWS} per replay"
+        )
+    
+    # Follows the active model like the windowed endpoint
+    schema = window_manager.schema
+    frames = []
+    try:
+        for chunk in store.iter_chunks(rows, REPLAY_CHUNK_ROWS):
+            inputs, timestamps = await run_in_threadpool(_replay_chunk, store, schema, chunk, request.windowed)
+            results = await inference_pool.predict_packed(inputs)
+            frames.extend(
+                {"timestamp": timestamp, "anomalies": result["anomalies"]}
+                for timestamp, result in zip(timestamps, results)
+                if result["anomalies"]
+            )
+    except PoolSaturatedError:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Inference capacity exhausted, retry later"
+        )
+    
+    return {"rows": rows.stop - rows.start, "flagged": len(frames), "frames": frames}
+
+@router.websocket("/stream")
+async def stream_predictions(websocket: WebSocket, windowed: bool = False, gated: Optional[bool] = None):
+    """
+    Score a continuous feed of sensor frames and push verdicts back incrementally
+    
+    With ?windowed=true frames are scored on their stream_id's sliding window.
+    Otherwise, with change-detection gating (GATE_ENABLED or ?gated=true),
+    steady-state frames reuse their stream's last verdict.
+    """
+    if gated is None:
+        gated = settings.GATE_ENABLED
+    
+    async def persist(results: List[dict]):
+        anomaly_writer.enqueue(_anomaly_rows(results))
+    
+    async def predict(frames: List[dict]) -> List[dict]:
+        if windowed:
+            return await _predict_windowed(frames)
+        if gated:
+            return await _predict_gated(frames)
+        return await _predict_batch([frame["sensor_data"] for frame in frames])
+    
+    session = create_stream_session(websocket, predict, persist)
+    await session.run()
+
+def _parse_cursor(cursor: str):
+    """Parse a keyset cursor of the form <detected_at ISO timestamp>,<id>"""
+    try:
+        detected_at, anomaly_id = cursor.rsplit(",", 1)
+        return datetime.fromisoformat(detected_at), int(anomaly_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor, expected '<detected_at>,<id>'"
+        )
+
 @router.get("/anomalies", response_model=List[AnomalyResponse])
 async def get_anomalies(
-    limit: int = 50,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
     resolved: bool = False,
-    db: Session = Depends(get_db)
+    before: Optional[str] = None,
+    node_id: Optional[str] = None,
+    severity: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db=Depends(get_async_db)
 ):
-    """Get recent anomalies"""
-    query = db.query(Anomaly)
+    """
+    Get recent anomalies, newest first
+    
+    Pages with a keyset cursor: pass the X-Next-Cursor header of one page as
+    `before` to get the next one. Each page is an index range scan, so cost
+    stays proportional to `limit` regardless of table size.
+    """
+    query = select(Anomaly)
     
     if not resolved:
-        query = query.filter(Anomaly.is_resolved == False)
+        query = query.where(Anomaly.is_resolved == False)
+    if node_id:
+        query = query.where(Anomaly.node_id == node_id)
+    if severity:
+        query = query.where(Anomaly.severity == severity)
+    if since:
+        query = query.where(Anomaly.detected_at >= since)
+    if until:
+        query = query.where(Anomaly.detected_at < until)
+    if before:
+        before_at, before_id = _parse_cursor(before)
+        query = query.where(or_(
+            Anomaly.detected_at < before_at,
+            and_(Anomaly.detected_at == before_at, Anomaly.id < before_id)
+        ))
     
-    anomalies = query.order_by(Anomaly.detected_at.desc()).limit(limit).all()
+    query = query.order_by(Anomaly.detected_at.desc(), Anomaly.id.desc()).limit(limit)
+    anomalies = (await db.scalars(query)).all()
+    
+    if len(anomalies) == limit:
+        last = anomalies[-1]
+        response.headers["X-Next-Cursor"] = f"{last.detected_at.isoformat()},{last.id}"
     return anomalies
 
+@router.get("/anomalies/history", response_model=List[AnomalyRollupResponse])
+async def get_anomaly_history(
+    granularity: str = Query("hour", pattern="^(hour|day)$"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    node_id: Optional[str] = None,
+    severity: Optional[str] = None,
+    db=Depends(get_async_db)
+):
+    """Anomaly counts per hour/day bucket, node and severity (read from rollups, not raw rows)"""
+    query = select(AnomalyRollup).where(AnomalyRollup.granularity == granularity)
+    
+    if since:
+        query = query.where(AnomalyRollup.bucket_start >= since)
+    if until:
+        query = query.where(AnomalyRollup.bucket_start < until)
+    if node_id:
+        query = query.where(AnomalyRollup.node_id == node_id)
+    if severity:
+        query = query.where(AnomalyRollup.severity == severity)
+    
+    query = query.order_by(AnomalyRollup.bucket_start, AnomalyRollup.node_id, AnomalyRollup.severity)
+    return (await db.scalars(query)).all()
+
 @router.post("/anomalies/{anomaly_id}/resolve")
-async def resolve_anomaly(anomaly_id: int, db: Session = Depends(get_db)):
+async def resolve_anomaly(anomaly_id: int, db=Depends(get_async_db)):
     """Mark an anomaly as resolved"""
-    anomaly = db.query(Anomaly).filter(Anomaly.id == anomaly_id).first()
+    anomaly = await db.scalar(select(Anomaly).where(Anomaly.id == anomaly_id))
     
     if not anomaly:
         raise HTTPException(status_code=404, detail="Anomaly not found")
     
     anomaly.is_resolved = True
-    db.commit()
+    node_id = anomaly.node_id
+    await db.commit()
+    
+    event_hub.publish("anomaly_resolved", {"id": anomaly_id, "node_id": node_id})
+    still_open = await db.scalar(select(Anomaly.id).where(
+        Anomaly.node_id == node_id,
+        Anomaly.is_resolved == False
+    ).limit(1))
+    if not still_open:
+        _set_node_status(node_id, "normal")
     
     return {"message": "Anomaly resolved", "anomaly_id": anomaly_id}
 
+@router.get("/events")
+async def stream_events():
+    """
+    Server-Sent Events feed of dashboard deltas:
+    anomaly, anomaly_resolved, node_status (and resync when a client falls behind)
+    """
+    return StreamingResponse(
+        event_hub.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/topology")
 async def get_current_topology():
-    """Get current IIoT network topology"""
-    # Return a demo topology
-    topology = {
-        "nodes": [
-            {"id": f"node_{i}", "label": f"Sensor {i}", "status": "normal", "x": (i % 5) * 100, "y": (i // 5) * 100}
-            for i in range(10)
-        ],
-        "edges": [
-            {"source": "node_0", "target": "node_1"},
-            {"source": "node_1", "target": "node_2"},
-            {"source": "node_2", "target": "node_3"},
-            {"source": "node_3", "target": "node_4"},
-            {"source": "node_0", "target": "node_5"},
-            {"source": "node_5", "target": "node_6"},
-        ]
-    }
-    
-    return topology
+    """Get current IIoT network topology with live node statuses"""
+    # Serialized once per status change and served from cache otherwise
+    return Response(content=topology_registry.live_json(), media_type="application/json")
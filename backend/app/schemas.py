@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, Field, model_validator
-from typing import Optional
+from pydantic import AfterValidator, BaseModel, EmailStr, Field, model_validator
+from typing import Annotated, Optional
 from datetime import datetime
 from app.models.user import UserRole, UserStatus
 
@@ -61,11 +61,61 @@ class AnomalyResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class AnomalyRollupResponse(BaseModel):
+    granularity: str
+    bucket_start: datetime
+    node_id: str
+    severity: str
+    count: int
+    
+    class Config:
+        from_attributes = True
+
 # Model Prediction Schema
+def check_sensor_data(sensor_data: dict) -> dict:
+    """Reject frames with readings that are not numbers (422 for that request only)"""
+    # Imported here so the auth routes do not pull in numpy
+    from app.utils.feature_schema import invalid_readings
+
+    invalid = invalid_readings(sensor_data)
+    if invalid:
+        raise ValueError(f"Readings must be numbers: {', '.join(invalid)}")
+    return sensor_data
+
+SensorData = Annotated[dict, AfterValidator(check_sensor_data)]
+
 class PredictionRequest(BaseModel):
-    sensor_data: dict
+    sensor_data: SensorData
 
 class PredictionResponse(BaseModel):
     anomalies: list[dict]
     topology: dict
     timestamp: datetime
+
+class BatchPredictionRequest(BaseModel):
+    frames: list[SensorData] = Field(..., min_length=1)
+
+class BatchPredictionResponse(BaseModel):
+    predictions: list[PredictionResponse]
+
+class ModelLoadRequest(BaseModel):
+    version: str = Field(..., min_length=1, max_length=64)
+    path: str = Field(..., min_length=1)
+    activate: bool = True
+
+class WindowPredictionRequest(BaseModel):
+    stream_id: str = Field(..., min_length=1)
+    sensor_data: SensorData
+
+class WindowPredictionResponse(PredictionResponse):
+    window: dict
+
+class ReplayRequest(BaseModel):
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    windowed: bool = False
+
+class ReplayResponse(BaseModel):
+    rows: int
+    flagged: int
+    frames: list[dict]
@@ -0,0 +1 @@
+# Command-line tools (python -m app.tools.<name>)
@@ -0,0 +1,65 @@
+"""
+Benchmark the inference backends on one checkpoint
+
+For every backend that can be built (exports from app.tools.export_model
+are used when present), reports the parity error against eager and the
+median latency / throughput of a forward pass across batch sizes.
+
+    python -m app.tools.benchmark_backends [--checkpoint PATH] [--batch-sizes 1,8,64,256] [--threads 1]
+"""
+import argparse
+import statistics
+import time
+import torch
+from app.utils.backends import BACKENDS, create_backend, verify_parity
+from app.utils.feature_schema import DEFAULT_MODEL_PATH
+from app.utils.model_loader import ModelInference
+
+def time_forward(backend, inputs: torch.Tensor, repeats: int) -> float:
+    """Median seconds per forward pass (after a few warmup calls)"""
+    with torch.no_grad():
+        for _ in range(10):
+            backend(inputs)
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            backend(inputs)
+            timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", default=DEFAULT_MODEL_PATH, help="trained .pth state dict")
+    parser.add_argument("--batch-sizes", default="1,8,64,256")
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=1, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+
+    inference = ModelInference(args.checkpoint, backend="eager")
+    model, num_features = inference.model.cpu().eval(), inference.schema.num_features
+    if not inference.weights_loaded:
+        print("Warning: checkpoint not loaded, benchmarking an untrained network")
+
+    header = "".join(f"{f'bs={size}':>22}" for size in batch_sizes)
+    print(f"{'backend':<12}{'max error':>11}{header}")
+    print(f"{'':<23}" + "".join(f"{'us/call':>11}{'frames/s':>11}" for _ in batch_sizes))
+
+    for name in BACKENDS:
+        try:
+            backend = create_backend(name, model, args.checkpoint, num_features)
+        except Exception as e:
+            print(f"{name:<12} skipped: {e}")
+            continue
+
+        report = verify_parity(backend, model, num_features)
+        row = f"{name:<12}{report['max_abs_error']:>11.2e}"
+        for size in batch_sizes:
+            seconds = time_forward(backend, torch.randn(size, num_features), args.repeats)
+            row += f"{seconds * 1e6:>11.1f}{size / seconds:>11.0f}"
+        print(row + ("" if report["ok"] else "  (outside tolerance)"))
+
+if __name__ == "__main__":
+    main()
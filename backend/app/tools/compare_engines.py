@@ -0,0 +1,116 @@
+"""
+Compare the torch and NumPy inference engines on one checkpoint
+
+Each engine is started in a fresh interpreter to measure cold start
+(imports + weight load + first prediction), peak RSS and predict_packed
+latency (attribution of flagged frames included). Both engines then score
+the same random inputs in this process to check that the NumPy path
+matches torch. Export the .npz first with
+python -m app.tools.export_model --backends numpy.
+
+    python -m app.tools.compare_engines [--checkpoint PATH] [--samples 1024]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+from app.utils.feature_schema import DEFAULT_MODEL_PATH
+
+PROBE = """
+import json, resource, sys, time
+
+def peak_rss_mb():
+    # VmHWM resets on exec; ru_maxrss can carry over the parent's peak on Linux
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+started = time.perf_counter()
+from app.utils.inference import create_inference
+engine = create_inference({path!r}, strict=True, backend={backend!r})
+engine.predict_batch([{{}}])
+startup = time.perf_counter() - started
+
+import numpy as np
+latency = {{}}
+for size in (1, 64, 256):
+    inputs = np.random.randn(size, engine.schema.num_features).astype(np.float32)
+    for _ in range(10):
+        engine.predict_packed(inputs)
+    timings = []
+    for _ in range(100):
+        t = time.perf_counter()
+        engine.predict_packed(inputs)
+        timings.append(time.perf_counter() - t)
+    latency[size] = sorted(timings)[len(timings) // 2] * 1e6
+
+print(json.dumps({{
+    "startup_ms": startup * 1000.0,
+    "max_rss_mb": peak_rss_mb(),
+    "torch_imported": "torch" in sys.modules,
+    "latency_us": latency
+}}))
+"""
+
+def probe(model_path: str, backend: str) -> dict:
+    backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(path=model_path, backend=backend)],
+        cwd=backend_dir,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def parity(model_path: str, samples: int) -> dict:
+    """Anomaly probabilities and verdicts of both engines on the same inputs"""
+    from app.utils.inference import ANOMALY_THRESHOLD
+    from app.utils.model_loader import ModelInference
+    from app.utils.numpy_engine import NumpyModelInference
+    import torch
+
+    torch_engine = ModelInference(model_path, strict=True, backend="eager")
+    numpy_engine = NumpyModelInference(model_path, strict=True)
+
+    inputs = (np.random.default_rng(0).standard_normal((samples, numpy_engine.schema.num_features)) * 2.0).astype(np.float32)
+    with torch.no_grad():
+        expected = torch_engine._forward(torch.from_numpy(inputs))[:, 1].numpy()
+    actual = numpy_engine._forward(inputs)[:, 1]
+
+    return {
+        "max_abs_error": float(np.abs(expected - actual).max()),
+        "verdict_mismatches": int(((expected > ANOMALY_THRESHOLD) != (actual > ANOMALY_THRESHOLD)).sum())
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", default=DEFAULT_MODEL_PATH, help="trained .pth state dict (with exported .npz)")
+    parser.add_argument("--samples", type=int, default=1024, help="random frames for the parity check")
+    args = parser.parse_args()
+
+    report = parity(args.checkpoint, args.samples)
+    print(f"parity on {args.samples} frames: max |p_torch - p_numpy| = {report['max_abs_error']:.2e}, "
+          f"verdict mismatches = {report['verdict_mismatches']}")
+
+    print(f"\n{'engine':<8}{'startup ms':>12}{'peak RSS MB':>13}{'torch':>7}{'bs=1 us':>10}{'bs=64 us':>10}{'bs=256 us':>11}")
+    for backend in ("eager", "numpy"):
+        stats = probe(args.checkpoint, backend)
+        latency = stats["latency_us"]
+        print(
+            f"{backend:<8}{stats['startup_ms']:>12.1f}{stats['max_rss_mb']:>13.1f}"
+            f"{'yes' if stats['torch_imported'] else 'no':>7}"
+            f"{latency['1']:>10.1f}{latency['64']:>10.1f}{latency['256']:>11.1f}"
+        )
+
+    sys.exit(0 if report["max_abs_error"] <= 1e-5 and report["verdict_mismatches"] == 0 else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Chunked readers and label handling shared by the offline SWaT tools"""
+from typing import Iterator, Optional
+import numpy as np
+import pandas as pd
+
+LABEL_COLUMNS = ("Normal/Attack", "label", "Label", "attack", "Attack")
+
+# Approximate size of one SWaT CSV row (timestamp, 51 readings, label)
+SWAT_ROW_BYTES = 400
+
+def read_chunks(path: str, chunk_rows: int, limit: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV or Parquet dataset as DataFrames of about chunk_rows rows
+
+    Only one chunk is held in memory at a time. Parquet needs pyarrow; CSV
+    uses pyarrow's multithreaded streaming parser when it is installed (CSV
+    chunks are then sized in bytes, about chunk_rows rows of SWaT data).
+    Column names are stripped since SWaT exports pad some headers with spaces.
+    """
+    if path.endswith((".parquet", ".pq")):
+        import pyarrow.parquet as pq
+        chunks = (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows))
+    else:
+        try:
+            from pyarrow import csv
+        except ImportError:
+            chunks = pd.read_csv(path, chunksize=chunk_rows, nrows=limit)
+        else:
+            reader = csv.open_csv(path, read_options=csv.ReadOptions(block_size=chunk_rows * SWAT_ROW_BYTES))
+            chunks = (batch.to_pandas() for batch in reader)
+
+    remaining = limit
+    for chunk in chunks:
+        if remaining is not None:
+            if remaining <= 0:
+                break
+            chunk = chunk.iloc[:remaining]
+            remaining -= len(chunk)
+        chunk.columns = [str(column).strip() for column in chunk.columns]
+        yield chunk
+
+def find_label_column(columns, preferred: Optional[str] = None) -> Optional[str]:
+    """Name of the attack label column, if the dataset has one"""
+    if preferred is not None:
+        return preferred if preferred in columns else None
+    return next((column for column in LABEL_COLUMNS if column in columns), None)
+
+def attack_labels(labels: pd.Series) -> np.ndarray:
+    """Boolean attack flags from a Normal/Attack text column or a 0/1 column"""
+    if pd.api.types.is_numeric_dtype(labels):
+        return labels.to_numpy() != 0
+    # "Attack" and the "A ttack" typo of the original dataset
+    return labels.astype(str).str.replace(" ", "").str.lower().eq("attack").to_numpy()
+
+def detection_counts(flagged: np.ndarray, attacks: np.ndarray) -> tuple:
+    """(true positives, false positives, false negatives) of flagged frames against attack labels"""
+    true_positives = int((flagged & attacks).sum())
+    return true_positives, int(flagged.sum()) - true_positives, int(attacks.sum()) - true_positives
+
+def detection_stats(flagged: np.ndarray, attacks: np.ndarray) -> dict:
+    """Recall / precision / F1 of flagged frames against attack labels"""
+    return detection_scores(*detection_counts(flagged, attacks))
+
+def detection_scores(true_positives: int, false_positives: int, false_negatives: int) -> dict:
+    """Recall / precision / F1 from detection counts (summed over chunks)"""
+    attacks = true_positives + false_negatives
+    flagged = true_positives + false_positives
+    recall = true_positives / attacks if attacks else 0.0
+    precision = true_positives / flagged if flagged else 0.0
+    return {
+        "recall": recall,
+        "precision": precision,
+        "f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    }
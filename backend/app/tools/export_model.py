@@ -0,0 +1,86 @@
+"""
+Export a checkpoint for the optimized inference backends
+
+Writes the artifacts next to the checkpoint, where INFERENCE_BACKEND picks
+them up, and checks each one numerically against eager PyTorch:
+
+    <checkpoint>.ts.pt       frozen TorchScript        (torchscript)
+    <checkpoint>.int8.ts.pt  int8 dynamic quantization (quantized)
+    <checkpoint>.onnx        ONNX graph                (onnx, needs onnxruntime to run)
+    <checkpoint>.npz         NumPy weights             (numpy, torch-free)
+
+    python -m app.tools.export_model [--checkpoint PATH] [--backends torchscript,quantized,onnx,numpy]
+"""
+import argparse
+import sys
+import numpy as np
+import torch
+from app.utils.backends import artifact_path, create_backend, export_onnx, freeze, quantize, verify_parity
+from app.utils.feature_schema import DEFAULT_MODEL_PATH
+from app.utils.model_loader import ModelInference
+from app.utils.numpy_engine import NumpyModelInference, weights_path
+
+EXPORTABLE = ("torchscript", "quantized", "onnx", "numpy")
+
+def export_npz(model: torch.nn.Module, path: str):
+    """Save the Linear layers as w<i> (in, out; pre-transposed) and b<i> arrays"""
+    linears = [layer for layer in model.modules() if isinstance(layer, torch.nn.Linear)]
+    arrays = {}
+    for i, layer in enumerate(linears):
+        arrays[f"w{i}"] = layer.weight.detach().cpu().numpy().T.astype(np.float32)
+        arrays[f"b{i}"] = layer.bias.detach().cpu().numpy().astype(np.float32)
+    np.savez(path, **arrays)
+
+def numpy_parity(model: torch.nn.Module, model_path: str, num_features: int, samples: int = 256) -> dict:
+    """Max absolute difference in class probabilities between the NumPy engine and eager"""
+    engine = NumpyModelInference(model_path, strict=True)
+    inputs = torch.randn(samples, num_features, generator=torch.Generator().manual_seed(0)) * 2.0
+    with torch.no_grad():
+        expected = torch.softmax(model(inputs), dim=-1).numpy()
+    error = float(np.abs(engine._forward(inputs.numpy()) - expected).max())
+    return {"backend": "numpy", "max_abs_error": error, "tolerance": 1e-5, "ok": error <= 1e-5}
+
+def export(model_path: str, backends) -> bool:
+    inference = ModelInference(model_path, strict=True, backend="eager")
+    model, num_features = inference.model.cpu().eval(), inference.schema.num_features
+
+    all_ok = True
+    for name in backends:
+        path = weights_path(model_path) if name == "numpy" else artifact_path(model_path, name)
+        if name == "numpy":
+            export_npz(model, path)
+        elif name == "torchscript":
+            torch.jit.save(freeze(model, num_features), path)
+        elif name == "quantized":
+            torch.jit.save(freeze(quantize(model), num_features), path)
+        elif name == "onnx":
+            export_onnx(model, path, num_features)
+
+        try:
+            if name == "numpy":
+                report = numpy_parity(model, model_path, num_features)
+            else:
+                report = verify_parity(create_backend(name, model, model_path, num_features), model, num_features)
+            status = "ok" if report["ok"] else "MISMATCH"
+            all_ok = all_ok and report["ok"]
+            print(f"{name:<12} {path}  max error {report['max_abs_error']:.2e} (tolerance {report['tolerance']})  {status}")
+        except RuntimeError as e:
+            # e.g. onnxruntime not installed: exported, but not verifiable here
+            print(f"{name:<12} {path}  not verified: {e}")
+    return all_ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", default=DEFAULT_MODEL_PATH, help="trained .pth state dict")
+    parser.add_argument("--backends", default=",".join(EXPORTABLE), help="comma-separated subset of " + ", ".join(EXPORTABLE))
+    args = parser.parse_args()
+
+    backends = [name.strip() for name in args.backends.split(",") if name.strip()]
+    unknown = set(backends) - set(EXPORTABLE)
+    if unknown:
+        parser.error(f"unknown backends: {', '.join(sorted(unknown))}")
+
+    sys.exit(0 if export(args.checkpoint, backends) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Convert a SWaT CSV (or Parquet) export into a memory-mapped feature store
+
+The dataset is streamed in chunks and appended to one float32 file per tag,
+an int64 timestamp index and, when the dataset is labelled, attack flags.
+The store can then be sliced by time range without parsing anything
+(app.utils.feature_store.FeatureStore, python -m app.tools.score --store).
+
+    python -m app.tools.import_swat --data SWaT_Dataset_Attack_v0.csv --out stores/attack \\
+        [--timestamp-column Timestamp] [--timestamp-format "%d/%m/%Y %I:%M:%S %p"] [--append]
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from app.utils.feature_schema import SWAT_TAGS
+from app.utils.feature_store import FeatureStoreWriter
+from app.tools.datasets import attack_labels, find_label_column, read_chunks
+
+# Timestamp layout of the SWaT 2015 exports, e.g. "28/12/2015 10:00:00 AM"
+SWAT_TIMESTAMP_FORMAT = "%d/%m/%Y %I:%M:%S %p"
+
+def parse_timestamps(values: pd.Series, fmt: str) -> np.ndarray:
+    """Nanoseconds since the epoch, falling back to format inference"""
+    text = values.astype(str).str.strip()
+    try:
+        parsed = pd.to_datetime(text, format=fmt)
+    except ValueError:
+        parsed = pd.to_datetime(text, dayfirst=True, format="mixed")
+    return parsed.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", required=True, help="SWaT CSV or Parquet file")
+    parser.add_argument("--out", required=True, help="feature store directory")
+    parser.add_argument("--timestamp-column", default="Timestamp")
+    parser.add_argument("--timestamp-format", default=SWAT_TIMESTAMP_FORMAT)
+    parser.add_argument("--label-column", default=None, help="attack label column (detected by default)")
+    parser.add_argument("--chunk-rows", type=int, default=100000)
+    parser.add_argument("--append", action="store_true", help="append to an existing store")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    writer = None
+    try:
+        for chunk in read_chunks(args.data, args.chunk_rows):
+            if args.timestamp_column not in chunk.columns:
+                raise SystemExit(f"No {args.timestamp_column} column in {args.data}")
+            label_column = find_label_column(chunk.columns, args.label_column)
+            if writer is None:
+                writer = FeatureStoreWriter(args.out, SWAT_TAGS, labels=label_column is not None, append=args.append)
+                existing_rows = writer.rows
+
+            writer.append(
+                parse_timestamps(chunk[args.timestamp_column], args.timestamp_format),
+                {tag: pd.to_numeric(chunk[tag], errors="coerce").to_numpy() for tag in SWAT_TAGS if tag in chunk.columns},
+                attack_labels(chunk[label_column]) if label_column else None
+            )
+    except BaseException:
+        if writer is not None:
+            writer.close(commit=False)
+        raise
+
+    if writer is None:
+        raise SystemExit(f"{args.data} is empty")
+    writer.close()
+
+    elapsed = time.perf_counter() - started
+    imported = writer.rows - existing_rows
+    print(f"imported {imported} rows ({imported / elapsed:.0f} rows/s), {writer.rows} rows in {args.out}, "
+          f"labels: {'yes' if writer.labels else 'no'}")
+
+if __name__ == "__main__":
+    main()
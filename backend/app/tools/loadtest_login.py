@@ -0,0 +1,183 @@
+"""
+Check that a login storm does not slow down live predictions
+
+Sends /model/predict requests at a steady rate and records their latency,
+first on an idle server and then while --logins concurrent /auth/login
+calls (bcrypt verification) hit the same server. Reports p50 / p99 / max
+prediction latency for both phases and the login outcomes.
+
+Without --url, a local server is started on a throwaway SQLite database
+with a seeded, approved user:
+
+    python -m app.tools.loadtest_login [--url http://localhost:8000 --email E --password P]
+        [--logins 200] [--concurrency 50] [--predict-rps 50] [--baseline-seconds 5]
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+SEED_EMAIL = "loadtest@fyp.com"
+SEED_PASSWORD = "LoadTest@123"
+
+def post(url: str, payload: dict, timeout: float = 60.0) -> int:
+    """POST JSON and return the status code (0 when the request failed or timed out)"""
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, OSError):
+        return 0
+
+def percentiles(samples: List[float]) -> str:
+    if not samples:
+        return "no samples"
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"n={len(ordered)} p50={statistics.median(ordered):.1f} ms p99={p99:.1f} ms max={ordered[-1]:.1f} ms"
+
+class PredictProbe(threading.Thread):
+    """Sends /model/predict at a fixed rate and records latency in ms"""
+
+    def __init__(self, base_url: str, rate: float):
+        super().__init__(daemon=True)
+        self.url = f"{base_url}/model/predict"
+        self.interval = 1.0 / rate
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.stop_event = threading.Event()
+
+    def run(self):
+        next_at = time.perf_counter()
+        while not self.stop_event.is_set():
+            # Fresh readings every time so the result cache cannot answer
+            payload = {"sensor_data": {"FIT101": random.uniform(0, 3), "LIT101": random.uniform(100, 1000)}}
+            started = time.perf_counter()
+            status = post(self.url, payload)
+            if status == 200:
+                self.latencies.append((time.perf_counter() - started) * 1000.0)
+            else:
+                self.errors += 1
+            next_at += self.interval
+            time.sleep(max(0.0, next_at - time.perf_counter()))
+
+    def collect(self, seconds: float) -> Tuple[List[float], int]:
+        """Latencies and errors recorded over the next `seconds`"""
+        start, errors = len(self.latencies), self.errors
+        time.sleep(seconds)
+        return self.latencies[start:], self.errors - errors
+
+def login_storm(base_url: str, email: str, password: str, logins: int, concurrency: int) -> dict:
+    statuses = {}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for status in pool.map(lambda _: post(f"{base_url}/auth/login", {"email": email, "password": password}), range(logins)):
+            statuses[status] = statuses.get(status, 0) + 1
+    return {"seconds": time.perf_counter() - started, "statuses": statuses}
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_local_server(database_url: str) -> Tuple[str, subprocess.Popen]:
+    """Start uvicorn on a free port and wait until /ready answers 200"""
+    port = free_port()
+    backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=backend_dir,
+        env={**os.environ, "DATABASE_URL": database_url}
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/ready", timeout=2) as response:
+                if response.status == 200:
+                    return base_url, server
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise SystemExit("Local server did not become ready")
+
+def seed_user(database_url: str):
+    """Insert an approved, verified user (tables are created by the server's startup)"""
+    os.environ["DATABASE_URL"] = database_url
+    from app.database import SessionLocal
+    from app.models import User, UserRole, UserStatus
+    from app.utils.auth import get_password_hash
+
+    db = SessionLocal()
+    try:
+        db.add(User(
+            name="Load Test",
+            employee_id="LOADTEST001",
+            email=SEED_EMAIL,
+            hashed_password=get_password_hash(SEED_PASSWORD),
+            role=UserRole.USER,
+            status=UserStatus.APPROVED,
+            is_active=True,
+            email_verified=True
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="running API (default: start a local one)")
+    parser.add_argument("--email", default=SEED_EMAIL)
+    parser.add_argument("--password", default=SEED_PASSWORD)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent login requests")
+    parser.add_argument("--predict-rps", type=float, default=50.0)
+    parser.add_argument("--baseline-seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    server: Optional[subprocess.Popen] = None
+    base_url = args.url
+    if base_url is None:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'loadtest.db')}"
+        base_url, server = start_local_server(database_url)
+        seed_user(database_url)
+
+    try:
+        probe = PredictProbe(base_url.rstrip("/"), args.predict_rps)
+        probe.start()
+        baseline, baseline_errors = probe.collect(args.baseline_seconds)
+
+        start = len(probe.latencies)
+        storm = login_storm(base_url.rstrip("/"), args.email, args.password, args.logins, args.concurrency)
+        during = probe.latencies[start:]
+        probe.stop_event.set()
+        probe.join()
+
+        print(f"predict, idle:        {percentiles(baseline)} (errors: {baseline_errors})")
+        print(f"predict, login storm: {percentiles(during)}")
+        print(f"{args.logins} logins x{args.concurrency} in {storm['seconds']:.1f}s "
+              f"({args.logins / storm['seconds']:.1f}/s), status codes: {storm['statuses']}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Score a historical SWaT dataset offline
+
+Streams a CSV or Parquet file, or a time range of a feature store, in
+chunks, packs each chunk with the model's feature schema and scores it on
+a pool of worker processes (one model per worker). Results are written in
+input order to a Parquet file with the anomaly probability and flag of
+every row. At most 2 * workers chunks are in flight, so memory stays
+bounded whatever the input size. When the
+dataset has attack labels, precision / recall / F1 are reported.
+
+    python -m app.tools.score --data SWaT_Dataset_Attack_v0.csv --out scores.parquet \\
+        [--checkpoint PATH] [--backend numpy] [--workers 4] [--chunk-rows 50000] [--keep Timestamp]
+    python -m app.tools.score --store stores/attack --start 2015-12-28T10:00 --end 2015-12-28T12:00 \\
+        --windowed --out window_scores.parquet
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from app.config import settings
+from app.utils.feature_schema import DEFAULT_MODEL_PATH, FeatureSchema
+from app.utils.feature_store import FeatureStore
+from app.utils.inference import ANOMALY_THRESHOLD
+from app.tools.datasets import attack_labels, detection_counts, detection_scores, find_label_column, read_chunks
+
+# Model instance owned by a scoring worker
+_engine = None
+
+def _init_scorer(model_path: str, backend: str, torch_threads: int):
+    """Worker initializer: load the model once per process"""
+    global _engine
+    if backend != "numpy":
+        import torch
+        torch.set_num_threads(max(1, torch_threads))
+    from app.utils.inference import create_inference
+    _engine = create_inference(model_path, strict=True, backend=backend)
+
+def _score_chunk(inputs: np.ndarray) -> np.ndarray:
+    """Worker task: anomaly probabilities of a packed chunk"""
+    return _engine.anomaly_probabilities(inputs)
+
+def available_cpus() -> int:
+    """CPUs this process may run on (respects affinity / container cpusets)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def file_chunks(args, schema: FeatureSchema, keep: List[str]) -> Iterator[Tuple[np.ndarray, Dict, Optional[np.ndarray]]]:
+    """(model inputs, output columns, attack labels) per chunk of a CSV / Parquet file"""
+    for chunk in read_chunks(args.data, args.chunk_rows, args.limit):
+        label_column = find_label_column(chunk.columns, args.label_column)
+        attacks = attack_labels(chunk[label_column]) if label_column else None
+
+        numeric = {tag: pd.to_numeric(chunk[tag], errors="coerce") for tag in schema.tags if tag in chunk.columns}
+        inputs = schema.pack_columns(numeric, len(chunk))
+        yield inputs, {column: chunk[column].to_numpy() for column in keep if column in chunk.columns}, attacks
+
+def store_chunks(args, schema: FeatureSchema) -> Iterator[Tuple[np.ndarray, Dict, Optional[np.ndarray]]]:
+    """(model inputs, output columns, attack labels) per chunk of a feature store time range"""
+    store = FeatureStore(args.store)
+    rows = store.time_slice(args.start, args.end)
+    if args.limit is not None:
+        rows = slice(rows.start, min(rows.stop, rows.start + args.limit))
+
+    for chunk in store.iter_chunks(rows, args.chunk_rows):
+        if args.windowed:
+            inputs = store.windowed(schema, chunk, settings.WINDOW_SIZE)
+        else:
+            inputs = store.packed(schema, chunk)
+        attacks = store.labels[chunk].astype(bool) if store.labels is not None else None
+        yield inputs, {"timestamp": store.timestamps[chunk].astype("datetime64[ns]")}, attacks
+
+def output_table(columns: Dict, offset: int, probs: np.ndarray, attacks: Optional[np.ndarray]):
+    """Output rows of one scored chunk"""
+    import pyarrow as pa
+    table = {"row": np.arange(offset, offset + len(probs), dtype=np.int64), **columns}
+    table["anomaly_prob"] = probs.astype(np.float32)
+    table["anomaly"] = probs > ANOMALY_THRESHOLD
+    if attacks is not None:
+        table["attack"] = attacks
+    return pa.table(table)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data", help="SWaT CSV or Parquet file")
+    source.add_argument("--store", help="feature store directory (python -m app.tools.import_swat)")
+    parser.add_argument("--out", required=True, help="output Parquet file")
+    parser.add_argument("--checkpoint", default=DEFAULT_MODEL_PATH, help="trained .pth state dict")
+    parser.add_argument("--backend", default=settings.INFERENCE_BACKEND, help="inference backend of the workers")
+    parser.add_argument("--workers", type=int, default=available_cpus(), help="scoring processes (0 scores in-process)")
+    parser.add_argument("--threads", type=int, default=1, help="torch intra-op threads per worker")
+    parser.add_argument("--chunk-rows", type=int, default=50000)
+    parser.add_argument("--keep", default="Timestamp", help="comma-separated input columns copied to the output")
+    parser.add_argument("--label-column", default=None, help="attack label column (detected by default)")
+    parser.add_argument("--limit", type=int, default=None, help="only score the first N rows")
+    parser.add_argument("--start", default=None, help="--store: first timestamp to score (ISO 8601)")
+    parser.add_argument("--end", default=None, help="--store: score rows before this timestamp")
+    parser.add_argument("--windowed", action="store_true",
+                        help="--store: score WINDOW_SIZE sliding-window features like /model/predict/window")
+    args = parser.parse_args()
+
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        sys.exit("app.tools.score writes Parquet output and needs pyarrow: pip install 'pyarrow>=14.0.0'")
+
+    schema = FeatureSchema.for_checkpoint(args.checkpoint)
+    keep = [column.strip() for column in args.keep.split(",") if column.strip()]
+
+    if args.workers > 0:
+        pool = ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=_init_scorer,
+            initargs=(args.checkpoint, args.backend, args.threads)
+        )
+        submit = lambda inputs: pool.submit(_score_chunk, inputs)
+        max_in_flight = 2 * args.workers
+    else:
+        pool = None
+        _init_scorer(args.checkpoint, args.backend, args.threads)
+        submit = None
+        max_in_flight = 1
+
+    writer = None
+    in_flight = deque()
+    rows = 0
+    # Running detection counts, so nothing per row outlives its chunk
+    labelled = False
+    true_positives = false_positives = false_negatives = 0
+    started = time.perf_counter()
+
+    def drain(limit: int):
+        nonlocal writer, rows, labelled, true_positives, false_positives, false_negatives
+        while len(in_flight) > limit:
+            future, columns, offset, attacks = in_flight.popleft()
+            probs = future.result() if pool is not None else future
+            table = output_table(columns, offset, probs, attacks)
+            if writer is None:
+                writer = pq.ParquetWriter(args.out, table.schema)
+            writer.write_table(table)
+
+            rows += len(probs)
+            if attacks is not None:
+                counts = detection_counts(probs > ANOMALY_THRESHOLD, attacks)
+                labelled = True
+                true_positives += counts[0]
+                false_positives += counts[1]
+                false_negatives += counts[2]
+            print(f"{rows} rows, {rows / (time.perf_counter() - started):.0f} rows/s", file=sys.stderr)
+
+    try:
+        offset = 0
+        chunks = store_chunks(args, schema) if args.store else file_chunks(args, schema, keep)
+        for inputs, columns, attacks in chunks:
+            work = submit(inputs) if pool is not None else _score_chunk(inputs)
+            in_flight.append((work, columns, offset, attacks))
+            offset += len(inputs)
+            drain(max_in_flight - 1)
+        drain(0)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if writer is not None:
+            writer.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"scored {rows} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/s) -> {args.out}")
+
+    if labelled:
+        stats = detection_scores(true_positives, false_positives, false_negatives)
+        print(f"{true_positives + false_negatives} attack rows, {true_positives + false_positives} flagged: "
+              f"precision {stats['precision']:.3f}, recall {stats['recall']:.3f}, F1 {stats['f1']:.3f}")
+
+if __name__ == "__main__":
+    main()
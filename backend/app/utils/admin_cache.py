@@ -0,0 +1,157 @@
+import json
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from app.config import settings
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Cached admin reads derived from the users table
+PENDING_USERS = "pending_users"
+USER_COUNTS = "user_counts"
+
+class MemoryCacheBackend:
+    """
+    In-process stand-in for the Redis backend (get / set with TTL / incr)
+
+    Used when ADMIN_CACHE_REDIS_URL is unset. Invalidations only reach the
+    worker that made them, so with several uvicorn workers the other ones
+    serve stale admin reads for up to the cache TTL.
+    """
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[Optional[float], str]] = {}
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] <= time.monotonic():
+                del self._values[key]
+                return None
+            return entry[1]
+
+    async def set(self, key: str, value: str, ttl_seconds: float):
+        with self._lock:
+            # Drop expired entries so superseded generations do not pile up
+            now = time.monotonic()
+            for stale in [k for k, (expires, _) in self._values.items() if expires is not None and expires <= now]:
+                del self._values[stale]
+            self._values[key] = (now + ttl_seconds, value)
+
+    async def incr(self, key: str) -> int:
+        with self._lock:
+            value = int(self._values.get(key, (None, "0"))[1]) + 1
+            self._values[key] = (None, str(value))
+            return value
+
+    async def close(self):
+        pass
+
+class RedisCacheBackend:
+    """Redis (or any Redis-protocol server) shared by all uvicorn workers"""
+
+    def __init__(self, url: str):
+        # Optional dependency, only needed when ADMIN_CACHE_REDIS_URL is set
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: str, ttl_seconds: float):
+        await self._client.set(key, value, px=max(1, int(ttl_seconds * 1000)))
+
+    async def incr(self, key: str) -> int:
+        return await self._client.incr(key)
+
+    async def close(self):
+        await self._client.aclose()
+
+class AdminCache:
+    """
+    Read-through cache of admin dashboard reads, invalidated explicitly
+
+    Values are JSON documents stored under the current generation of the
+    users table (a counter in the backend). invalidate_users() bumps the
+    generation, so every worker sharing the backend misses on its next
+    read, and a load that raced with a write is stored under the old
+    generation where nobody will read it. ttl_seconds only bounds how long
+    a missed invalidation (a write outside the API) can go unnoticed.
+    Backend errors fall back to the database instead of failing the route.
+    """
+
+    def __init__(self, backend, ttl_seconds: float = 30.0, prefix: str = "fyp:admin"):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+        self.hits = metrics.counter("admin_cache_hits_total", "Admin reads served from the cache")
+        self.misses = metrics.counter("admin_cache_misses_total", "Admin reads loaded from the database")
+        self.invalidations = metrics.counter("admin_cache_invalidations_total", "User changes that invalidated admin reads")
+        self.errors = metrics.counter("admin_cache_errors_total", "Cache backend errors (served from the database)")
+
+    @property
+    def _generation_key(self) -> str:
+        return f"{self.prefix}:users:generation"
+
+    async def _generation(self) -> str:
+        return await self.backend.get(self._generation_key) or "0"
+
+    async def get_or_load(self, name: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Cached value of `name`, or the result of loader() (JSON-serializable), stored for later reads"""
+        try:
+            key = f"{self.prefix}:users:{await self._generation()}:{name}"
+            cached = await self.backend.get(key)
+        except Exception as e:
+            self.errors.inc()
+            logger.warning(f"Admin cache unavailable, reading from the database: {str(e)}")
+            return await loader()
+
+        if cached is not None:
+            self.hits.inc()
+            return json.loads(cached)
+
+        self.misses.inc()
+        value = await loader()
+        try:
+            await self.backend.set(key, json.dumps(value), self.ttl_seconds)
+        except Exception as e:
+            self.errors.inc()
+            logger.warning(f"Admin cache write failed: {str(e)}")
+        return value
+
+    async def invalidate_users(self):
+        """Call after any change to users that admin reads depend on (signup, verification, approval)"""
+        self.invalidations.inc()
+        try:
+            await self.backend.incr(self._generation_key)
+        except Exception as e:
+            self.errors.inc()
+            logger.error(f"Admin cache invalidation failed, entries expire within {self.ttl_seconds}s: {str(e)}")
+
+    def stats(self) -> Dict:
+        return {
+            "backend": "redis" if isinstance(self.backend, RedisCacheBackend) else "memory",
+            "ttl_seconds": self.ttl_seconds,
+            "hits": int(self.hits.value),
+            "misses": int(self.misses.value),
+            "invalidations": int(self.invalidations.value),
+            "errors": int(self.errors.value)
+        }
+
+def create_admin_cache() -> AdminCache:
+    """Build the admin cache from settings (Redis when ADMIN_CACHE_REDIS_URL is set)"""
+    if settings.ADMIN_CACHE_REDIS_URL:
+        backend = RedisCacheBackend(settings.ADMIN_CACHE_REDIS_URL)
+    else:
+        backend = MemoryCacheBackend()
+    return AdminCache(backend, ttl_seconds=settings.ADMIN_CACHE_TTL_SECONDS, prefix=settings.ADMIN_CACHE_PREFIX)
+
+# Global admin dashboard cache
+admin_cache = create_admin_cache()
@@ -0,0 +1,162 @@
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# Sliding windows reported by the admin dashboard: name -> seconds
+WINDOWS = {"1m": 60, "1h": 3600, "24h": 86400}
+BUCKETS_PER_WINDOW = 60
+
+class SlidingWindowCounter:
+    """
+    Event count over the last window_seconds, kept in a ring of time buckets
+
+    Adding and reading are O(1) amortized: a running total is maintained and
+    buckets are only cleared (and subtracted) as time moves past them.
+    """
+
+    def __init__(self, window_seconds: float, buckets: int = BUCKETS_PER_WINDOW):
+        self.window_seconds = window_seconds
+        self.num_buckets = buckets
+        self.bucket_seconds = window_seconds / buckets
+        self._counts = [0] * buckets
+        self._total = 0
+        self._last_tick: Optional[int] = None
+
+    def _advance(self, now: float):
+        tick = int(now // self.bucket_seconds)
+        if self._last_tick is None:
+            self._last_tick = tick
+            return
+
+        elapsed = tick - self._last_tick
+        if elapsed <= 0:
+            return
+        if elapsed >= self.num_buckets:
+            self._counts = [0] * self.num_buckets
+            self._total = 0
+        else:
+            for step in range(1, elapsed + 1):
+                index = (self._last_tick + step) % self.num_buckets
+                self._total -= self._counts[index]
+                self._counts[index] = 0
+        self._last_tick = tick
+
+    def add(self, amount: int = 1, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        self._advance(now)
+        self._counts[self._last_tick % self.num_buckets] += amount
+        self._total += amount
+
+    def total(self, now: Optional[float] = None) -> int:
+        self._advance(time.time() if now is None else now)
+        return self._total
+
+    def rate_per_second(self, now: Optional[float] = None) -> float:
+        return self.total(now) / self.window_seconds
+
+class LatencyReservoir:
+    """Ring buffer of the most recent latency samples for percentile reads"""
+
+    def __init__(self, size: int = 2048):
+        self._samples = np.zeros(size, dtype=np.float64)
+        self._size = size
+        self._next = 0
+        self._filled = 0
+
+    def observe(self, value: float):
+        self._samples[self._next] = value
+        self._next = (self._next + 1) % self._size
+        self._filled = min(self._filled + 1, self._size)
+
+    def percentiles(self, points=(50, 95, 99)) -> Dict[str, float]:
+        if not self._filled:
+            return {f"p{p}": 0.0 for p in points}
+        values = np.percentile(self._samples[:self._filled], points)
+        return {f"p{p}": round(float(v), 3) for p, v in zip(points, values)}
+
+class DetectionAnalytics:
+    """
+    Incrementally maintained detection statistics for the admin dashboard
+
+    The prediction path calls record_batch() after every scored batch;
+    readers get anomaly rates per node/severity over 1 min / 1 h / 24 h,
+    inference latency percentiles and throughput without touching the DB.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frames = {name: SlidingWindowCounter(seconds) for name, seconds in WINDOWS.items()}
+        self._anomalies = {name: SlidingWindowCounter(seconds) for name, seconds in WINDOWS.items()}
+        self._by_key: Dict[Tuple[str, str], Dict[str, SlidingWindowCounter]] = defaultdict(
+            lambda: {name: SlidingWindowCounter(seconds) for name, seconds in WINDOWS.items()}
+        )
+        self._latency = LatencyReservoir()
+        self._batches = SlidingWindowCounter(WINDOWS["1m"])
+        self._errors = SlidingWindowCounter(WINDOWS["1m"])
+
+    def record_batch(self, results: List[Dict], latency_ms: float, now: Optional[float] = None):
+        """Record one scored batch of frames and the anomalies it produced"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._latency.observe(latency_ms)
+            self._batches.add(1, now)
+            for counter in self._frames.values():
+                counter.add(len(results), now)
+
+            for result in results:
+                for anomaly in result["anomalies"]:
+                    key = (anomaly["node_id"], anomaly.get("severity", "medium"))
+                    for counter in self._by_key[key].values():
+                        counter.add(1, now)
+                    for counter in self._anomalies.values():
+                        counter.add(1, now)
+
+    def record_error(self, now: Optional[float] = None):
+        """Record a rejected or failed prediction"""
+        with self._lock:
+            self._errors.add(1, now)
+
+    def snapshot(self) -> Dict:
+        now = time.time()
+        with self._lock:
+            by_node: Dict[str, Dict[str, Dict[str, int]]] = defaultdict(dict)
+            for (node_id, severity), counters in self._by_key.items():
+                counts = {name: counter.total(now) for name, counter in counters.items()}
+                if counts["24h"]:
+                    by_node[node_id][severity] = counts
+
+            return {
+                "anomalies": {name: counter.total(now) for name, counter in self._anomalies.items()},
+                "anomalies_by_node": dict(by_node),
+                "anomaly_rate_per_minute": {
+                    name: round(counter.rate_per_second(now) * 60, 3)
+                    for name, counter in self._anomalies.items()
+                },
+                "throughput_fps": {
+                    name: round(counter.rate_per_second(now), 3)
+                    for name, counter in self._frames.items()
+                },
+                "frames_scored": {name: counter.total(now) for name, counter in self._frames.items()},
+                "inference_latency_ms": self._latency.percentiles(),
+                "errors_last_minute": self._errors.total(now),
+                "batches_last_minute": self._batches.total(now)
+            }
+
+    def system_health(self, latency_budget_ms: float = 250.0, snapshot: Optional[Dict] = None) -> str:
+        """Coarse health verdict from recent errors and tail latency (of snapshot, if already taken)"""
+        if snapshot is None:
+            snapshot = self.snapshot()
+        errors = snapshot["errors_last_minute"]
+        batches = snapshot["batches_last_minute"]
+        p99 = snapshot["inference_latency_ms"]["p99"]
+
+        if batches and errors > batches:
+            return "Critical"
+        if errors or p99 > latency_budget_ms:
+            return "Degraded"
+        return "Good"
+
+# Global analytics instance
+detection_analytics = DetectionAnalytics()
@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import re
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Anomaly, AnomalyRollup
+from app.models.anomaly import PARTITIONED
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_GRANULARITIES = ("hour", "day")
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    """Floor a timestamp to the start of its hour/day/month bucket"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    moment = moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if granularity in ("day", "month"):
+        moment = moment.replace(hour=0)
+    if granularity == "month":
+        moment = moment.replace(day=1)
+    return moment
+
+def _next_bucket(start: datetime, granularity: str) -> datetime:
+    if granularity == "day":
+        return start + timedelta(days=1)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+def increment_rollups(db: Session, rows: List[Dict]):
+    """
+    Add freshly inserted anomaly rows to the hourly and daily rollup counts
+
+    Runs in the same transaction as the bulk insert, so rollups never drift
+    from the raw rows. Uses INSERT ... ON CONFLICT DO UPDATE where the
+    dialect supports it.
+    """
+    counts: Counter = Counter()
+    for row in rows:
+        for granularity in ROLLUP_GRANULARITIES:
+            counts[(
+                granularity,
+                bucket_start(row["detected_at"], granularity),
+                row["node_id"],
+                row.get("severity", "medium")
+            )] += 1
+
+    if not counts:
+        return
+
+    values = [
+        {"granularity": g, "bucket_start": b, "node_id": n, "severity": s, "count": c}
+        for (g, b, n, s), c in counts.items()
+    ]
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        statement = upsert(AnomalyRollup).values(values)
+        statement = statement.on_conflict_do_update(
+            index_elements=["granularity", "bucket_start", "node_id", "severity"],
+            set_={"count": AnomalyRollup.count + statement.excluded["count"]}
+        )
+        db.execute(statement)
+        return
+
+    for value in values:
+        rollup = db.query(AnomalyRollup).filter_by(
+            granularity=value["granularity"],
+            bucket_start=value["bucket_start"],
+            node_id=value["node_id"],
+            severity=value["severity"]
+        ).with_for_update().first()
+        if rollup:
+            rollup.count += value["count"]
+        else:
+            db.add(AnomalyRollup(**value))
+
+class AnomalyStorageManager:
+    """
+    Maintain time partitions and retention for the anomalies table
+
+    PostgreSQL: anomalies is RANGE-partitioned on detected_at into monthly
+    (or daily) child tables named anomalies_pYYYY_MM[_DD]. Partitions are
+    created ahead of time and expired ones are removed with DROP TABLE,
+    which is O(1) regardless of row count.
+
+    Other dialects (SQLite in tests), and PostgreSQL databases whose
+    anomalies table predates partitioning: there is a single table, so
+    retention falls back to a ranged DELETE on the indexed detected_at column.
+    """
+
+    PARTITION_NAME = re.compile(r"^anomalies_p(\d{4})_(\d{2})(?:_(\d{2}))?$")
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        interval: str = "month",
+        partitions_ahead: int = 2,
+        retention_days: int = 180
+    ):
+        if interval not in ("month", "day"):
+            raise ValueError(f"Unknown partition interval: {interval}")
+
+        self.session_factory = session_factory
+        self.interval = interval
+        self.partitions_ahead = max(1, partitions_ahead)
+        self.retention_days = retention_days
+        self._worker: Optional[asyncio.Task] = None
+        self._partitioned: Optional[bool] = None
+
+        self.partitions_dropped = metrics.counter("anomaly_partitions_dropped_total", "Expired anomaly partitions dropped")
+        self.rows_expired = metrics.counter("anomaly_rows_expired_total", "Anomaly rows deleted by the non-partitioned retention fallback")
+
+    def _partition_name(self, start: datetime) -> str:
+        if self.interval == "day":
+            return f"anomalies_p{start:%Y_%m_%d}"
+        return f"anomalies_p{start:%Y_%m}"
+
+    def _partition_range(self, name: str) -> Optional[Tuple[datetime, datetime]]:
+        match = self.PARTITION_NAME.match(name)
+        if not match:
+            return None
+        year, month, day = match.groups()
+        start = datetime(int(year), int(month), int(day or 1), tzinfo=timezone.utc)
+        return start, _next_bucket(start, "day" if day else "month")
+
+    def partitioned(self, db: Session) -> bool:
+        """Whether the anomalies table in the database is actually partitioned (checked once)"""
+        if not PARTITIONED:
+            return False
+        if self._partitioned is None:
+            self._partitioned = bool(db.execute(text(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+                "JOIN pg_class c ON c.oid = pt.partrelid "
+                "WHERE c.relname = 'anomalies' AND pg_table_is_visible(c.oid))"
+            )).scalar())
+            if not self._partitioned:
+                logger.warning(
+                    "The anomalies table is not partitioned (created before ANOMALY_PARTITIONING); "
+                    "falling back to DELETE retention until it is migrated"
+                )
+        return self._partitioned
+
+    def ensure_partitions(self, db: Session, now: Optional[datetime] = None) -> List[str]:
+        """Create the current partition and the next few ahead of time"""
+        if not self.partitioned(db):
+            return []
+
+        start = bucket_start(now or datetime.now(timezone.utc), self.interval)
+        created = []
+        for _ in range(self.partitions_ahead + 1):
+            end = _next_bucket(start, self.interval)
+            name = self._partition_name(start)
+            db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF anomalies "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+            created.append(name)
+            start = end
+        db.commit()
+        return created
+
+    def list_partitions(self, db: Session) -> List[str]:
+        if not self.partitioned(db):
+            return []
+        return list(db.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'anomalies' ORDER BY c.relname"
+        )).scalars())
+
+    def enforce_retention(self, db: Session, now: Optional[datetime] = None) -> int:
+        """Remove anomalies older than the retention window; returns partitions/rows removed"""
+        if self.retention_days <= 0:
+            return 0
+
+        cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=self.retention_days)
+
+        if not self.partitioned(db):
+            deleted = db.query(Anomaly).filter(Anomaly.detected_at < cutoff).delete(synchronize_session=False)
+            db.commit()
+            self.rows_expired.inc(deleted)
+            return deleted
+
+        dropped = 0
+        for name in self.list_partitions(db):
+            bounds = self._partition_range(name)
+            # Only whole partitions are dropped; the boundary one ages out later
+            if bounds and bounds[1] <= cutoff:
+                db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                dropped += 1
+                logger.info(f"Dropped expired anomaly partition {name}")
+        db.commit()
+        self.partitions_dropped.inc(dropped)
+        return dropped
+
+    def run_maintenance(self, now: Optional[datetime] = None):
+        """Create upcoming partitions and apply retention (blocking)"""
+        db = self.session_factory()
+        try:
+            self.ensure_partitions(db, now)
+            self.enforce_retention(db, now)
+        finally:
+            db.close()
+
+    async def _run(self, interval_seconds: float):
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await run_in_threadpool(self.run_maintenance)
+            except Exception as e:
+                logger.error(f"Anomaly storage maintenance failed: {str(e)}")
+
+    def start(self, interval_seconds: float = 3600.0):
+        """Repeat maintenance periodically in the background"""
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run(interval_seconds))
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+# Global storage manager
+anomaly_storage = AnomalyStorageManager(
+    interval=settings.ANOMALY_PARTITION_INTERVAL,
+    partitions_ahead=settings.ANOMALY_PARTITIONS_AHEAD,
+    retention_days=settings.ANOMALY_RETENTION_DAYS
+)
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, List, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Anomaly
+from app.schemas import AnomalyResponse
+from app.utils.anomaly_storage import increment_rollups
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+FLUSH_MS_BUCKETS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000]
+FLUSH_ROWS_BUCKETS = [1, 10, 50, 100, 500, 1000, 5000]
+
+class AnomalyWriter:
+    """
+    Write-behind buffer for Anomaly rows
+
+    The prediction path only appends rows to an in-memory buffer. A
+    background task flushes the buffer with one bulk INSERT (executemany)
+    when it reaches flush_size rows or every flush_interval_ms, whichever
+    comes first; hourly/daily rollups are updated in the same transaction.
+    Rows from a failed flush go back to the front of the buffer and are
+    retried after a backoff that doubles with each consecutive failure (up
+    to retry_max_seconds). The buffer holds at most max_buffer rows; while
+    the database is down the oldest rows are dropped and counted. stop()
+    drains whatever is left.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        flush_size: int = 500,
+        flush_interval_ms: float = 200.0,
+        on_flush: Optional[Callable[[List[Dict]], None]] = None,
+        max_buffer: int = 50000,
+        retry_base_seconds: float = 0.5,
+        retry_max_seconds: float = 30.0
+    ):
+        self.session_factory = session_factory
+        self.flush_size = max(1, flush_size)
+        self.flush_interval = max(1.0, flush_interval_ms) / 1000.0
+        self.on_flush = on_flush
+        self.max_buffer = max(self.flush_size, max_buffer)
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = max(retry_base_seconds, retry_max_seconds)
+        self._buffer: List[Dict] = []
+        self._failures = 0
+        self._retry_at = 0.0
+        self._dropping = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        self.queue_depth = metrics.gauge("anomaly_writer_queue_depth", "Anomaly rows waiting to be written")
+        self.flush_ms = metrics.histogram("anomaly_writer_flush_ms", FLUSH_MS_BUCKETS, "Bulk insert latency")
+        self.flush_rows = metrics.histogram("anomaly_writer_flush_rows", FLUSH_ROWS_BUCKETS, "Rows per bulk insert")
+        self.rows_written = metrics.counter("anomaly_writer_rows_written_total", "Anomaly rows written")
+        self.flush_failures = metrics.counter("anomaly_writer_flush_failures_total", "Bulk inserts that failed and were retried")
+        self.rows_dropped = metrics.counter("anomaly_writer_rows_dropped_total", "Oldest buffered rows dropped because the buffer was full")
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._worker = asyncio.create_task(self._run())
+
+    def enqueue(self, rows: List[Dict]):
+        """Buffer anomaly rows for the next flush (call from the event loop)"""
+        if not rows:
+            return
+        self._ensure_started()
+        self._buffer.extend(rows)
+        self._trim()
+        self.queue_depth.set(len(self._buffer))
+        if len(self._buffer) >= self.flush_size:
+            self._wakeup.set()
+
+    def _trim(self):
+        """Drop the oldest rows beyond max_buffer"""
+        overflow = len(self._buffer) - self.max_buffer
+        if overflow <= 0:
+            return
+        del self._buffer[:overflow]
+        self.rows_dropped.inc(overflow)
+        if not self._dropping:
+            # Logged once per outage; anomaly_writer_rows_dropped_total has the count
+            self._dropping = True
+            logger.error(f"Anomaly buffer full ({self.max_buffer} rows), dropping the oldest rows")
+
+    def _backoff_remaining(self) -> float:
+        return max(0.0, self._retry_at - time.monotonic())
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                # After failed flushes, sleep out the backoff instead of retrying every tick
+                timeout = max(self.flush_interval, self._backoff_remaining())
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self, force: bool = False):
+        """Write out everything currently buffered (a no-op while backing off, unless force)"""
+        if self._flush_lock is None:
+            self._ensure_started()
+
+        async with self._flush_lock:
+            while self._buffer:
+                if not force and self._backoff_remaining() > 0:
+                    return
+                rows = self._buffer[:self.flush_size]
+                del self._buffer[:len(rows)]
+
+                started = time.perf_counter()
+                try:
+                    stored = await run_in_threadpool(self._write, rows)
+                except Exception as e:
+                    self._failures += 1
+                    backoff = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (self._failures - 1))
+                    self._retry_at = time.monotonic() + backoff
+                    logger.error(f"Failed to write {len(rows)} anomalies, retrying in {backoff:.1f}s: {str(e)}")
+                    self._buffer[:0] = rows
+                    self._trim()
+                    self.flush_failures.inc()
+                    self.queue_depth.set(len(self._buffer))
+                    return
+
+                self._failures = 0
+                self._retry_at = 0.0
+                self._dropping = False
+
+                self.flush_ms.observe((time.perf_counter() - started) * 1000.0)
+                self.flush_rows.observe(len(rows))
+                self.rows_written.inc(len(rows))
+                self.queue_depth.set(len(self._buffer))
+
+                if self.on_flush is not None:
+                    self.on_flush(stored)
+
+    def _write(self, rows: List[Dict]) -> List[Dict]:
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                insert(Anomaly).returning(Anomaly, sort_by_parameter_order=True),
+                rows
+            )
+            stored = [
+                AnomalyResponse.model_validate(anomaly).model_dump(mode="json")
+                for anomaly in result.scalars()
+            ]
+            increment_rollups(db, rows)
+            db.commit()
+            return stored
+        finally:
+            db.close()
+
+    async def stop(self):
+        """Let the background task finish its current flush, then drain the buffer"""
+        if self._worker is not None and not self._worker.done():
+            self._stopping = True
+            self._wakeup.set()
+            await self._worker
+        self._worker = None
+
+        if self._buffer:
+            await self.flush(force=True)
+            if self._buffer:
+                logger.error(f"{len(self._buffer)} anomalies could not be written on shutdown")
+        self._stopping = False
+
+def create_anomaly_writer(on_flush: Optional[Callable[[List[Dict]], None]] = None) -> AnomalyWriter:
+    """Build a writer using the configured flush triggers"""
+    return AnomalyWriter(
+        flush_size=settings.ANOMALY_FLUSH_SIZE,
+        flush_interval_ms=settings.ANOMALY_FLUSH_INTERVAL_MS,
+        on_flush=on_flush,
+        max_buffer=settings.ANOMALY_BUFFER_MAX_ROWS,
+        retry_base_seconds=settings.ANOMALY_RETRY_BASE_SECONDS,
+        retry_max_seconds=settings.ANOMALY_RETRY_MAX_SECONDS
+    )
@@ -13,10 +13,18 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     """Hash a password"""
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
+def needs_rehash(hashed_password: str) -> bool:
+    """Whether a stored hash uses another bcrypt cost (or format) than the configured one"""
+    # Modular crypt format: $2b$<cost>$<salt+hash>
+    parts = hashed_password.split("$")
+    if len(parts) != 4 or parts[1] not in ("2a", "2b", "2y"):
+        return True
+    return not parts[2].isdigit() or int(parts[2]) != settings.BCRYPT_ROUNDS
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -0,0 +1,143 @@
+import inspect
+import os
+from typing import Dict, Optional
+import torch
+import torch.nn as nn
+from app.config import settings
+
+BACKENDS = ("eager", "torchscript", "quantized", "onnx")
+
+# Max absolute difference in class probabilities allowed against eager
+# (int8 weights legitimately move probabilities by a few hundredths)
+PARITY_TOLERANCE = {"eager": 0.0, "torchscript": 1e-5, "quantized": 0.05, "onnx": 1e-5}
+
+def artifact_path(model_path: str, backend: str) -> str:
+    """Path of an exported artifact stored next to a checkpoint"""
+    stem = os.path.splitext(model_path.rstrip("/\\"))[0]
+    return {
+        "torchscript": stem + ".ts.pt",
+        "quantized": stem + ".int8.ts.pt",
+        "onnx": stem + ".onnx",
+    }[backend]
+
+def quantize(model: nn.Module) -> nn.Module:
+    """int8 dynamic quantization of the Linear layers (weights int8, activations quantized per batch)"""
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+def freeze(model: nn.Module, num_features: int) -> torch.jit.ScriptModule:
+    """Trace, freeze and optimize a model for CPU inference"""
+    traced = torch.jit.trace(model.eval(), torch.zeros(1, num_features))
+    return torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+
+def export_onnx(model: nn.Module, path: str, num_features: int):
+    """Export a model to ONNX with a dynamic batch dimension"""
+    kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        # The TorchScript-based exporter needs no extra packages for an MLP
+        kwargs["dynamo"] = False
+    torch.onnx.export(
+        model.eval(),
+        (torch.zeros(1, num_features),),
+        path,
+        input_names=["inputs"],
+        output_names=["logits"],
+        dynamic_axes={"inputs": {0: "batch"}, "logits": {0: "batch"}},
+        **kwargs
+    )
+
+class InferenceBackend:
+    """Runs the network: (batch, features) float32 CPU tensor in, logits out"""
+
+    name = "eager"
+
+    def __init__(self, module: nn.Module):
+        self.module = module
+
+    def __call__(self, inputs: torch.Tensor) -> torch.Tensor:
+        return self.module(inputs)
+
+class TorchScriptBackend(InferenceBackend):
+    """Frozen TorchScript graph (exported .ts.pt if present, else traced in memory)"""
+
+    name = "torchscript"
+
+    def __init__(self, model: nn.Module, model_path: str, num_features: int):
+        path = artifact_path(model_path, self.name)
+        if os.path.exists(path):
+            module = torch.jit.load(path, map_location="cpu")
+        else:
+            module = freeze(model, num_features)
+        super().__init__(module)
+
+class QuantizedBackend(InferenceBackend):
+    """int8 dynamically quantized Linear layers (exported .int8.ts.pt if present)"""
+
+    name = "quantized"
+
+    def __init__(self, model: nn.Module, model_path: str, num_features: int):
+        path = artifact_path(model_path, self.name)
+        if os.path.exists(path):
+            module = torch.jit.load(path, map_location="cpu")
+        else:
+            module = freeze(quantize(model), num_features)
+        super().__init__(module)
+
+class OnnxBackend(InferenceBackend):
+    """ONNX Runtime session on the exported .onnx file (optional dependency)"""
+
+    name = "onnx"
+
+    def __init__(self, model_path: str):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError("The onnx backend requires the onnxruntime package")
+
+        path = artifact_path(model_path, self.name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"ONNX export not found at {path}, run python -m app.tools.export_model")
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = max(1, settings.INFERENCE_TORCH_THREADS)
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        super().__init__(None)
+
+    def __call__(self, inputs: torch.Tensor) -> torch.Tensor:
+        # numpy()/from_numpy share memory with the tensors on CPU
+        logits = self.session.run(None, {self.input_name: inputs.numpy()})[0]
+        return torch.from_numpy(logits)
+
+def create_backend(name: str, model: nn.Module, model_path: str, num_features: int) -> InferenceBackend:
+    """Build the named backend for an eager model loaded from model_path"""
+    if name == "eager":
+        return InferenceBackend(model)
+    if name == "torchscript":
+        return TorchScriptBackend(model, model_path, num_features)
+    if name == "quantized":
+        return QuantizedBackend(model, model_path, num_features)
+    if name == "onnx":
+        return OnnxBackend(model_path)
+    raise ValueError(f"Unknown inference backend: {name}")
+
+def parity_error(backend: InferenceBackend, model: nn.Module, num_features: int, samples: int = 256) -> float:
+    """Max absolute difference in class probabilities between a backend and eager"""
+    generator = torch.Generator().manual_seed(0)
+    # Standardized inputs: mostly within a few std of the training mean
+    inputs = torch.randn(samples, num_features, generator=generator) * 2.0
+    with torch.no_grad():
+        expected = torch.softmax(model(inputs), dim=-1)
+        actual = torch.softmax(backend(inputs), dim=-1)
+    return float((expected - actual).abs().max())
+
+def verify_parity(
+    backend: InferenceBackend,
+    model: nn.Module,
+    num_features: int,
+    tolerance: Optional[float] = None
+) -> Dict:
+    """Compare a backend against eager; the result says whether it is within tolerance"""
+    tolerance = PARITY_TOLERANCE[backend.name] if tolerance is None else tolerance
+    error = parity_error(backend, model, num_features)
+    return {"backend": backend.name, "max_abs_error": error, "tolerance": tolerance, "ok": error <= tolerance}
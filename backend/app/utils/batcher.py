@@ -0,0 +1,153 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from app.config import settings
+from app.utils.executor import inference_pool, PoolSaturatedError
+from app.utils.metrics import metrics
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+LATENCY_MS_BUCKETS = [0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000]
+
+class MicroBatcher:
+    """
+    Collect concurrent prediction requests and run them as one batch
+
+    Requests are queued and a single worker task drains the queue: it waits
+    for the first frame, then keeps collecting until either max_batch_size
+    frames are queued or max_wait_ms has elapsed, runs one vectorized
+    forward pass and resolves each caller's future with its own result.
+    Up to max_in_flight batches are scored at once (one per inference
+    worker); while all are busy the next batch keeps filling. At most
+    max_queue frames may wait, beyond that submit() raises
+    PoolSaturatedError so the route answers 429.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[List[Dict]], Awaitable[List[Dict]]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        max_queue: int = 256,
+        max_in_flight: int = 2
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_queue = max(1, max_queue)
+        self.max_in_flight = max(1, max_in_flight)
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._batches: Set[asyncio.Task] = set()
+        self._running = 0
+
+        self.batch_size = metrics.histogram(
+            "batcher_batch_size", BATCH_SIZE_BUCKETS, "Frames per forward pass"
+        )
+        self.queue_latency = metrics.histogram(
+            "batcher_queue_latency_ms", LATENCY_MS_BUCKETS, "Time a frame waited in the batch queue"
+        )
+        self.batches_total = metrics.counter("batcher_batches_total", "Forward passes run by the batcher")
+        self.frames_total = metrics.counter("batcher_frames_total", "Frames scored by the batcher")
+        self.rejected = metrics.counter("batcher_rejected_total", "Frames rejected because the batch queue was full")
+        self.in_flight = metrics.gauge("batcher_in_flight", "Batches being scored")
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+            self._worker = asyncio.create_task(self._run())
+
+    async def submit(self, sensor_data: Dict) -> Dict:
+        """Queue one frame and wait for its prediction (PoolSaturatedError when the queue is full)"""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((sensor_data, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected.inc()
+            raise PoolSaturatedError("Batch queue is full")
+        return await future
+
+    async def _collect(self) -> List:
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            # Wait for a free slot first, so frames keep batching up while all are busy
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = asyncio.create_task(self._dispatch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _dispatch(self, batch: List):
+        started = time.perf_counter()
+        for _, _, enqueued_at in batch:
+            self.queue_latency.observe((started - enqueued_at) * 1000.0)
+        self.batch_size.observe(len(batch))
+        self.batches_total.inc()
+        self.frames_total.inc(len(batch))
+        self._running += 1
+        self.in_flight.set(self._running)
+
+        try:
+            results = await self.predict_fn([frame for frame, _, _ in batch])
+        except asyncio.CancelledError:
+            for _, future, _ in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._running -= 1
+            self.in_flight.set(self._running)
+            self._slots.release()
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def stop(self):
+        """Cancel the worker task and batches in flight"""
+        tasks = list(self._batches)
+        if self._worker is not None:
+            tasks.append(self._worker)
+            self._worker = None
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+def create_batcher(predict_fn: Callable[[List[Dict]], Awaitable[List[Dict]]]) -> MicroBatcher:
+    """Build a batcher using the configured batching window (one batch in flight per inference worker)"""
+    return MicroBatcher(
+        predict_fn,
+        max_batch_size=settings.BATCH_MAX_SIZE,
+        max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+        max_queue=settings.BATCH_MAX_QUEUE,
+        max_in_flight=settings.BATCH_MAX_IN_FLIGHT or inference_pool.max_workers
+    )
@@ -0,0 +1,352 @@
+import asyncio
+import logging
+import random
+import smtplib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import delete, func, or_, select, update
+from app.config import settings
+from app.database import SessionLocal
+from app.models import EmailOutbox
+from app.utils.email_service import email_service
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SEND_MS_BUCKETS = [5, 10, 25, 50, 100, 250, 500, 1000, 5000, 30000]
+
+def _is_connection_error(error: Exception) -> bool:
+    """Errors of the connection rather than of one message (SMTPException is an OSError too)"""
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError,
+                          smtplib.SMTPHeloError, smtplib.SMTPAuthenticationError)):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+class SMTPConnection:
+    """
+    Persistent SMTP connection shared by all deliveries of a dispatcher
+
+    Connect, STARTTLS and login happen once; the connection is then reused
+    for every message. After keepalive_seconds idle it is checked with NOOP
+    before use, after idle_close_seconds idle it is closed, and a connection
+    the server dropped is reopened once on send. Not thread-safe: it is
+    only used from the dispatcher's single worker thread.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = True,
+        auth: bool = True,
+        timeout: float = 30.0,
+        keepalive_seconds: float = 60.0,
+        idle_close_seconds: float = 300.0
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.auth = auth
+        self.timeout = timeout
+        self.keepalive_seconds = keepalive_seconds
+        self.idle_close_seconds = idle_close_seconds
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+
+        self.connects = metrics.counter("email_smtp_connects_total", "SMTP connections opened (handshake + login)")
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.auth:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.connects.inc()
+        return server
+
+    def _get(self) -> smtplib.SMTP:
+        if self._server is not None and time.monotonic() - self._last_used > self.keepalive_seconds:
+            try:
+                alive = self._server.noop()[0] == 250
+            except OSError:
+                alive = False
+            if not alive:
+                self.close()
+        if self._server is None:
+            self._server = self._connect()
+        return self._server
+
+    def send(self, from_email: str, to_email: str, message: str):
+        reused = self._server is not None
+        try:
+            try:
+                self._get().sendmail(from_email, to_email, message)
+            except smtplib.SMTPServerDisconnected:
+                self.close()
+                if not reused:
+                    raise
+                # The server dropped an idle connection since the last check
+                self._get().sendmail(from_email, to_email, message)
+        except Exception as e:
+            if _is_connection_error(e):
+                self.close()
+            raise
+        self._last_used = time.monotonic()
+
+    def close_if_idle(self):
+        if self._server is not None and time.monotonic() - self._last_used > self.idle_close_seconds:
+            self.close()
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            self._server.close()
+        self._server = None
+
+def _is_permanent(error: Exception) -> bool:
+    """5xx replies for the message itself will not succeed on retry"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(500 <= code < 600 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException) and not _is_connection_error(error):
+        return 500 <= error.smtp_code < 600
+    return False
+
+class EmailDispatcher:
+    """
+    Background delivery of the email outbox
+
+    Each cycle claims up to batch_size due messages (a lease in
+    locked_until, so several uvicorn workers can dispatch the same outbox
+    without sending a message twice), sends them over one persistent SMTP
+    connection and records the outcome of each message as it goes. Failed
+    sends are retried with exponential backoff and jitter until
+    max_attempts; permanent (5xx) rejections fail at once. A connection
+    failure defers the rest of the batch. Routes call notify() after
+    committing a message so it goes out without waiting for the next poll.
+    Delivery is at-least-once: a crash between send and commit resends the
+    message once its lease expires.
+    """
+
+    def __init__(
+        self,
+        connection: SMTPConnection,
+        session_factory=SessionLocal,
+        batch_size: int = 50,
+        poll_seconds: float = 5.0,
+        max_attempts: int = 6,
+        retry_base_seconds: float = 30.0,
+        retry_max_seconds: float = 3600.0,
+        retention_days: int = 7
+    ):
+        self.connection = connection
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.retention_days = retention_days
+        self.lease_seconds = connection.timeout * (self.batch_size + 2)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._last_purge = 0.0
+
+        self.sent = metrics.counter("email_sent_total", "Emails delivered")
+        self.retried = metrics.counter("email_retries_total", "Email attempts that failed and were rescheduled")
+        self.failed = metrics.counter("email_failed_total", "Emails given up on (permanent rejection or max attempts)")
+        self.pending_gauge = metrics.gauge("email_outbox_pending", "Emails waiting in the outbox")
+        self.send_ms = metrics.histogram("email_send_ms", SEND_MS_BUCKETS, "SMTP delivery time per email")
+
+    def retry_delay(self, attempts: int) -> float:
+        """Backoff before attempt attempts + 1"""
+        delay = min(self.retry_max_seconds, self.retry_base_seconds * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.8, 1.2)
+
+    def _claim(self, db, now: datetime) -> List[EmailOutbox]:
+        unleased = or_(EmailOutbox.locked_until.is_(None), EmailOutbox.locked_until < now)
+        candidates = db.scalars(
+            select(EmailOutbox.id)
+            .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now, unleased)
+            .order_by(EmailOutbox.id)
+            .limit(self.batch_size)
+        ).all()
+
+        lease_end = now + timedelta(seconds=self.lease_seconds)
+        claimed = []
+        for message_id in candidates:
+            result = db.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.id == message_id, EmailOutbox.status == "pending", unleased)
+                .values(locked_until=lease_end)
+            )
+            if result.rowcount == 1:
+                claimed.append(message_id)
+        db.commit()
+        if not claimed:
+            return []
+        return db.scalars(select(EmailOutbox).where(EmailOutbox.id.in_(claimed)).order_by(EmailOutbox.id)).all()
+
+    def _deliver(self, message: EmailOutbox):
+        if email_service.simulated:
+            logger.warning("Email credentials not configured. Email not sent.")
+            print(f"[EMAIL SIMULATION] To: {message.to_email}")
+            print(f"[EMAIL SIMULATION] Subject: {message.subject}")
+            print(f"[EMAIL SIMULATION] Would send email with content")
+            return
+        started = time.perf_counter()
+        self.connection.send(
+            email_service.from_email,
+            message.to_email,
+            email_service.build_message(message.to_email, message.subject, message.html_content)
+        )
+        self.send_ms.observe((time.perf_counter() - started) * 1000.0)
+
+    def _record_failure(self, message: EmailOutbox, error: Exception, now: datetime):
+        message.attempts += 1
+        message.last_error = str(error)[:500]
+        if _is_permanent(error) or message.attempts >= self.max_attempts:
+            message.status = "failed"
+            self.failed.inc()
+            logger.error(f"Giving up on email {message.id} to {message.to_email} after {message.attempts} attempts: {str(error)}")
+        else:
+            message.next_attempt_at = now + timedelta(seconds=self.retry_delay(message.attempts))
+            self.retried.inc()
+            logger.warning(f"Failed to send email {message.id} to {message.to_email}, retrying: {str(error)}")
+
+    def dispatch_once(self) -> int:
+        """Deliver one batch of due messages; returns how many were claimed"""
+        db = self.session_factory()
+        try:
+            messages = self._claim(db, datetime.now(timezone.utc))
+            for index, message in enumerate(messages):
+                now = datetime.now(timezone.utc)
+                message.locked_until = None
+                try:
+                    self._deliver(message)
+                except Exception as e:
+                    self._record_failure(message, e, now)
+                    if _is_connection_error(e):
+                        # The server is unreachable: retry the rest of the batch later, without counting an attempt
+                        retry_at = now + timedelta(seconds=self.retry_delay(1))
+                        for deferred in messages[index + 1:]:
+                            deferred.next_attempt_at = retry_at
+                            deferred.locked_until = None
+                        db.commit()
+                        break
+                else:
+                    message.status = "sent"
+                    message.attempts += 1
+                    message.sent_at = now
+                    message.last_error = None
+                    self.sent.inc()
+                    logger.info(f"Email sent successfully to {message.to_email}")
+                # Committed per message so a crash mid-batch never resends delivered ones
+                db.commit()
+
+            self.pending_gauge.set(db.scalar(select(func.count(EmailOutbox.id)).where(EmailOutbox.status == "pending")))
+            self._purge(db)
+            return len(messages)
+        finally:
+            db.close()
+
+    def _purge(self, db):
+        """Drop sent messages past the retention (at most hourly)"""
+        if time.monotonic() - self._last_purge < 3600:
+            return
+        self._last_purge = time.monotonic()
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+        db.execute(delete(EmailOutbox).where(EmailOutbox.status == "sent", EmailOutbox.sent_at < cutoff))
+        db.commit()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wake.clear()
+            try:
+                claimed = await loop.run_in_executor(self._executor, self.dispatch_once)
+            except Exception as e:
+                logger.error(f"Email dispatch failed: {str(e)}")
+                claimed = 0
+            if claimed >= self.batch_size:
+                continue  # More may be due right away
+            await loop.run_in_executor(self._executor, self.connection.close_if_idle)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="smtp")
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def notify(self):
+        """Wake the dispatcher after committing new messages (call from the event loop)"""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def stop(self):
+        """Stop after the batch in flight; undelivered messages stay in the outbox"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.connection.close)
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+    def stats(self) -> Dict:
+        return {
+            "running": self._task is not None,
+            "pending": int(self.pending_gauge.value),
+            "sent": int(self.sent.value),
+            "retries": int(self.retried.value),
+            "failed": int(self.failed.value),
+            "smtp_connects": int(self.connection.connects.value)
+        }
+
+def create_email_dispatcher() -> EmailDispatcher:
+    """Build the outbox dispatcher and its SMTP connection from settings"""
+    connection = SMTPConnection(
+        settings.MAIL_SERVER,
+        settings.MAIL_PORT,
+        username=settings.MAIL_USERNAME,
+        password=settings.MAIL_PASSWORD,
+        starttls=settings.MAIL_STARTTLS,
+        auth=settings.MAIL_AUTH,
+        timeout=settings.MAIL_TIMEOUT_SECONDS,
+        keepalive_seconds=settings.MAIL_KEEPALIVE_SECONDS,
+        idle_close_seconds=settings.MAIL_IDLE_CLOSE_SECONDS
+    )
+    return EmailDispatcher(
+        connection,
+        batch_size=settings.MAIL_BATCH_SIZE,
+        poll_seconds=settings.MAIL_POLL_SECONDS,
+        max_attempts=settings.MAIL_MAX_ATTEMPTS,
+        retry_base_seconds=settings.MAIL_RETRY_BASE_SECONDS,
+        retry_max_seconds=settings.MAIL_RETRY_MAX_SECONDS,
+        retention_days=settings.MAIL_OUTBOX_RETENTION_DAYS
+    )
+
+# Global email outbox dispatcher
+email_dispatcher = create_email_dispatcher()
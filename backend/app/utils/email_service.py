@@ -1,16 +1,22 @@
-import smtplib
 import secrets
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
 from typing import Optional
 from app.config import settings
+from app.models import EmailOutbox
 import logging
 
 logger = logging.getLogger(__name__)
 
 class EmailService:
-    """Service for sending emails"""
+    """
+    Renders emails and queues them in the outbox
+    
+    Messages are added to the caller's session, so they are committed
+    together with the change that triggers them and sent afterwards by
+    app.utils.email_dispatcher (no SMTP round trip inside a request).
+    """
     
     def __init__(self):
         self.smtp_server = settings.MAIL_SERVER
@@ -21,42 +27,34 @@ class EmailService:
         self.from_name = settings.MAIL_FROM_NAME
         self.frontend_url = settings.FRONTEND_URL
     
-    def _send_email(self, to_email: str, subject: str, html_content: str) -> bool:
-        """Send an email using SMTP"""
-        try:
-            if not self.username or not self.password:
-                logger.warning("Email credentials not configured. Email not sent.")
-                print(f"[EMAIL SIMULATION] To: {to_email}")
-                print(f"[EMAIL SIMULATION] Subject: {subject}")
-                print(f"[EMAIL SIMULATION] Would send email with content")
-                return True
-            
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = f"{self.from_name} <{self.from_email}>"
-            msg['To'] = to_email
-            
-            html_part = MIMEText(html_content, 'html')
-            msg.attach(html_part)
-            
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.username, self.password)
-                server.sendmail(self.from_email, to_email, msg.as_string())
-            
-            logger.info(f"Email sent successfully to {to_email}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to send email to {to_email}: {str(e)}")
-            return False
+    @property
+    def simulated(self) -> bool:
+        """No credentials configured: emails are logged instead of sent"""
+        return settings.MAIL_AUTH and not (self.username and self.password)
+    
+    def build_message(self, to_email: str, subject: str, html_content: str) -> str:
+        """MIME message ready for SMTP sendmail"""
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = f"{self.from_name} <{self.from_email}>"
+        msg['To'] = to_email
+        
+        html_part = MIMEText(html_content, 'html')
+        msg.attach(html_part)
+        return msg.as_string()
+    
+    def _queue_email(self, db, to_email: str, subject: str, html_content: str) -> EmailOutbox:
+        """Add an email to the outbox; it is sent once the session commits"""
+        message = EmailOutbox(to_email=to_email, subject=subject, html_content=html_content)
+        db.add(message)
+        return message
     
     def generate_verification_token(self) -> str:
         """Generate a secure random token for email verification"""
         return secrets.token_urlsafe(32)
     
-    def send_verification_email(self, to_email: str, user_name: str, token: str) -> bool:
-        """Send email verification link to new user"""
+    def queue_verification_email(self, db, to_email: str, user_name: str, token: str) -> EmailOutbox:
+        """Queue the email verification link for a new user"""
         verification_link = f"{self.frontend_url}/verify-email?token={token}"
         
         subject = "Verify Your Email - IIoT Security Dashboard"
@@ -129,10 +127,10 @@ class EmailService:
         </html>
         """
         
-        return self._send_email(to_email, subject, html_content)
+        return self._queue_email(db, to_email, subject, html_content)
     
-    def send_approval_email(self, to_email: str, user_name: str) -> bool:
-        """Send notification email when user is approved"""
+    def queue_approval_email(self, db, to_email: str, user_name: str) -> EmailOutbox:
+        """Queue the notification email for an approved user"""
         login_link = f"{self.frontend_url}/login"
         
         subject = "🎉 Account Approved - IIoT Security Dashboard"
@@ -204,10 +202,10 @@ class EmailService:
         </html>
         """
         
-        return self._send_email(to_email, subject, html_content)
+        return self._queue_email(db, to_email, subject, html_content)
     
-    def send_rejection_email(self, to_email: str, user_name: str, reason: Optional[str] = None) -> bool:
-        """Send notification email when user registration is declined"""
+    def queue_rejection_email(self, db, to_email: str, user_name: str, reason: Optional[str] = None) -> EmailOutbox:
+        """Queue the notification email for a declined registration"""
         
         subject = "Registration Status Update - IIoT Security Dashboard"
         
@@ -279,7 +277,7 @@ class EmailService:
         </html>
         """
         
-        return self._send_email(to_email, subject, html_content)
+        return self._queue_email(db, to_email, subject, html_content)
 
 
 # Create singleton instance
@@ -0,0 +1,65 @@
+import asyncio
+import json
+from typing import AsyncIterator, Dict, Optional, Set
+from app.config import settings
+from app.utils.metrics import metrics
+
+class EventHub:
+    """
+    In-process pub/sub hub for dashboard deltas
+
+    Each subscriber gets a bounded queue. publish() never blocks the
+    prediction path: a subscriber that falls behind has its queue cleared
+    and receives a single "resync" event telling it to refetch state.
+    """
+
+    def __init__(self, max_queue: int = 1000):
+        self.max_queue = max(1, max_queue)
+        self._subscribers: Set[asyncio.Queue] = set()
+
+        self.subscribers_gauge = metrics.gauge("events_subscribers", "Connected dashboard event subscribers")
+        self.published = metrics.counter("events_published_total", "Events published to dashboards")
+        self.dropped = metrics.counter("events_resyncs_total", "Subscribers forced to resync after falling behind")
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue)
+        self._subscribers.add(queue)
+        self.subscribers_gauge.set(len(self._subscribers))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        self.subscribers_gauge.set(len(self._subscribers))
+
+    def publish(self, event_type: str, data: Dict):
+        """Fan an event out to every subscriber (call from the event loop)"""
+        event = {"type": event_type, "data": data}
+        self.published.inc()
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync", "data": {}})
+                self.dropped.inc()
+
+    async def stream(self, heartbeat_seconds: Optional[float] = None) -> AsyncIterator[str]:
+        """Yield Server-Sent Events for one subscriber until it disconnects"""
+        heartbeat = heartbeat_seconds or settings.EVENTS_HEARTBEAT_SECONDS
+        queue = self.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    # SSE comment line keeps proxies from closing the idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+        finally:
+            self.unsubscribe(queue)
+
+# Global event hub
+event_hub = EventHub(max_queue=settings.EVENTS_MAX_QUEUE)
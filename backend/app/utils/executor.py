@@ -0,0 +1,219 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from app.config import settings
+from app.utils.feature_schema import DEFAULT_MODEL_PATH
+from app.utils.metrics import metrics
+
+TASK_MS_BUCKETS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+# Model instance owned by a process-pool worker (unused in thread mode)
+_worker_model = None
+
+def _init_worker(torch_threads: int, load_model: bool, model_path: Optional[str] = None):
+    """Executor initializer: pin torch intra-op threads and load the model in child processes"""
+    if settings.INFERENCE_BACKEND != "numpy":
+        import torch
+        torch.set_num_threads(max(1, torch_threads))
+
+    if load_model:
+        global _worker_model
+        from app.utils.inference import create_inference
+        _worker_model = create_inference(model_path)
+        _worker_model.warmup()
+
+def _worker_model_instance():
+    """This worker's model, or the registry's active model in thread mode"""
+    if _worker_model is not None:
+        return _worker_model
+    from app.utils.model_registry import model_registry
+    return model_registry.current()
+
+def _run_predict_batch(frames: List[Dict]) -> List[Dict]:
+    """Executor task: score a batch with the model owned by this worker"""
+    return _worker_model_instance().predict_batch(frames)
+
+def _run_predict_packed(inputs) -> List[Dict]:
+    """Executor task: score packed model inputs with the model owned by this worker"""
+    return _worker_model_instance().predict_packed(inputs)
+
+def _worker_ready() -> bool:
+    """Executor task: returns once the worker's initializer (model load) has run"""
+    return _worker_model is not None
+
+class PoolSaturatedError(Exception):
+    """Raised when the inference pool has no free worker or queue slot"""
+
+class InferencePool:
+    """
+    Bounded executor that keeps model inference off the asyncio event loop
+
+    At most max_workers tasks run at once and at most max_queue more may
+    wait for a worker; anything beyond that is rejected immediately with
+    PoolSaturatedError so callers can answer 429 instead of piling up.
+    """
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        max_workers: int = 2,
+        max_queue: int = 32,
+        torch_threads: int = 1
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown inference pool kind: {kind}")
+
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.torch_threads = torch_threads
+        self.model_path: Optional[str] = None
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._running = 0
+
+        self.running_gauge = metrics.gauge("inference_pool_running", "Tasks currently executing in the inference pool")
+        self.queued_gauge = metrics.gauge("inference_pool_queued", "Tasks waiting for an inference worker")
+        self.utilization_gauge = metrics.gauge("inference_pool_utilization", "Fraction of inference workers busy")
+        self.rejected = metrics.counter("inference_pool_rejected_total", "Tasks rejected because the pool was saturated")
+        self.completed = metrics.counter("inference_pool_completed_total", "Tasks completed by the inference pool")
+        self.task_ms = metrics.histogram("inference_pool_task_ms", TASK_MS_BUCKETS, "Inference task run time")
+        self.wait_ms = metrics.histogram("inference_pool_wait_ms", TASK_MS_BUCKETS, "Time a task waited for a worker")
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    @property
+    def saturated(self) -> bool:
+        return self._in_flight >= self.capacity
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = self._process_executor(self.model_path)
+                    else:
+                        # Thread workers share the process, so this sets the
+                        # process-wide intra-op thread count once
+                        _init_worker(self.torch_threads, False)
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.max_workers,
+                            thread_name_prefix="inference"
+                        )
+        return self._executor
+
+    def _process_executor(self, model_path: Optional[str]) -> Executor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.torch_threads, True, model_path)
+        )
+
+    def reload(self, model_path: str):
+        """
+        Point process workers at a new checkpoint without a serving gap
+
+        Thread workers read the model registry on every task, so this only
+        matters in process mode: a new set of workers is started and warmed
+        up first, then swapped in; the old workers finish their queued
+        tasks and exit. Blocking, so call it off the event loop.
+        """
+        if self.kind != "process":
+            return
+        if self._executor is not None and (self.model_path or DEFAULT_MODEL_PATH) == model_path:
+            return
+
+        executor = self._process_executor(model_path)
+        for future in [executor.submit(_worker_ready) for _ in range(self.max_workers)]:
+            future.result()
+        with self._lock:
+            old, self._executor, self.model_path = self._executor, executor, model_path
+        if old is not None:
+            old.shutdown(wait=False)
+
+    def _busy_workers(self) -> int:
+        if self.kind == "process":
+            return min(self._in_flight, self.max_workers)
+        return self._running
+
+    def _update_gauges(self):
+        busy = self._busy_workers()
+        self.running_gauge.set(busy)
+        self.queued_gauge.set(self._in_flight - busy)
+        self.utilization_gauge.set(busy / self.max_workers)
+
+    def _timed(self, fn: Callable, enqueued_at: float, *args):
+        with self._lock:
+            self._running += 1
+            self._update_gauges()
+        started = time.perf_counter()
+        self.wait_ms.observe((started - enqueued_at) * 1000.0)
+        try:
+            return fn(*args)
+        finally:
+            self.task_ms.observe((time.perf_counter() - started) * 1000.0)
+            with self._lock:
+                self._running -= 1
+                self._update_gauges()
+
+    async def run(self, fn: Callable, *args):
+        """Run fn(*args) on the pool, raising PoolSaturatedError when full"""
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self.rejected.inc()
+                raise PoolSaturatedError("Inference pool is saturated")
+            self._in_flight += 1
+            self._update_gauges()
+
+        loop = asyncio.get_running_loop()
+        try:
+            if self.kind == "process":
+                # Run/wait time is not observable across the process boundary,
+                # so busy workers are estimated from the in-flight count
+                return await loop.run_in_executor(self._get_executor(), fn, *args)
+            return await loop.run_in_executor(
+                self._get_executor(), self._timed, fn, time.perf_counter(), *args
+            )
+        finally:
+            self.completed.inc()
+            with self._lock:
+                self._in_flight -= 1
+                self._update_gauges()
+
+    async def predict_batch(self, frames: List[Dict]) -> List[Dict]:
+        """Score a batch of sensor frames on an inference worker"""
+        return await self.run(_run_predict_batch, frames)
+
+    async def predict_packed(self, inputs) -> List[Dict]:
+        """Score already packed model inputs (e.g. window features) on an inference worker"""
+        return await self.run(_run_predict_packed, inputs)
+
+    def stats(self) -> Dict:
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "running": self._busy_workers(),
+            "utilization": self._busy_workers() / self.max_workers
+        }
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+# Global inference pool
+inference_pool = InferencePool(
+    kind=settings.INFERENCE_POOL_KIND,
+    max_workers=settings.INFERENCE_POOL_WORKERS,
+    max_queue=settings.INFERENCE_POOL_MAX_QUEUE,
+    torch_threads=settings.INFERENCE_TORCH_THREADS
+)
@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+from itertools import repeat
+from typing import Dict, List, Mapping, Optional, Sequence
+import numpy as np
+
+# Checkpoint served when no other model version is loaded
+DEFAULT_MODEL_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), "../../..", "swat_fdai_model_final.pth"))
+
+# The 51 SWaT sensor/actuator tags in model input order (stages P1-P6)
+SWAT_TAGS = [
+    # P1 - raw water
+    "FIT101", "LIT101", "MV101", "P101", "P102",
+    # P2 - pre-treatment / chemical dosing
+    "AIT201", "AIT202", "AIT203", "FIT201", "MV201",
+    "P201", "P202", "P203", "P204", "P205", "P206",
+    # P3 - ultrafiltration
+    "DPIT301", "FIT301", "LIT301", "MV301", "MV302", "MV303", "MV304", "P301", "P302",
+    # P4 - dechlorination
+    "AIT401", "AIT402", "FIT401", "LIT401", "P401", "P402", "P403", "P404", "UV401",
+    # P5 - reverse osmosis
+    "AIT501", "AIT502", "AIT503", "AIT504", "FIT501", "FIT502", "FIT503", "FIT504",
+    "P501", "P502", "PIT501", "PIT502", "PIT503",
+    # P6 - backwash
+    "FIT601", "P601", "P602", "P603",
+]
+
+class FeatureSchema:
+    """
+    Fixed mapping from SWaT tags to model input columns
+
+    Frames are packed by tag name rather than dict order. Missing readings
+    (absent keys, None, or values that are not numbers such as "abc" or
+    lists) are filled with the tag's mean, and every column is standardized
+    with the (mean, std) vector shipped next to the checkpoint.
+    """
+
+    def __init__(
+        self,
+        tags: Sequence[str] = SWAT_TAGS,
+        mean: Optional[Sequence[float]] = None,
+        std: Optional[Sequence[float]] = None
+    ):
+        self.tags = list(tags)
+        self.index: Dict[str, int] = {tag: i for i, tag in enumerate(self.tags)}
+        self.num_features = len(self.tags)
+
+        self.mean = np.zeros(self.num_features, dtype=np.float32) if mean is None else np.asarray(mean, dtype=np.float32)
+        self.std = np.ones(self.num_features, dtype=np.float32) if std is None else np.asarray(std, dtype=np.float32)
+        if self.mean.shape != (self.num_features,) or self.std.shape != (self.num_features,):
+            raise ValueError("Normalization vectors must have one entry per tag")
+
+        # Guard against constant columns (std == 0) in the training data
+        self.inv_std = np.where(self.std > 0, 1.0 / np.where(self.std > 0, self.std, 1.0), 1.0).astype(np.float32)
+
+        # Per-thread preallocated input buffers (inference pool threads pack concurrently)
+        self._local = threading.local()
+
+    @classmethod
+    def for_checkpoint(cls, model_path: str) -> "FeatureSchema":
+        """Load the normalization file stored next to a checkpoint, if any"""
+        norm_path = normalization_path(model_path)
+        if not os.path.exists(norm_path):
+            return cls()
+
+        with open(norm_path) as f:
+            data = json.load(f)
+        return cls(tags=data.get("tags", SWAT_TAGS), mean=data.get("mean"), std=data.get("std"))
+
+    def _buffer(self, rows: int) -> np.ndarray:
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or buffer.shape[0] < rows:
+            capacity = max(rows, 2 * buffer.shape[0] if buffer is not None else 64)
+            buffer = np.empty((capacity, self.num_features), dtype=np.float32)
+            self._local.buffer = buffer
+        return buffer[:rows]
+
+    def pack(self, frames: List[Dict]) -> np.ndarray:
+        """
+        Pack sensor frames into a normalized (len(frames), num_features) array
+
+        The returned array is a view into this thread's preallocated buffer and
+        is only valid until the next pack() call on the same thread.
+        """
+        out = self._buffer(len(frames))
+        nan = float("nan")
+        # map(frame.get, ...) looks every tag up in C; numpy does the float
+        # conversion (None and numeric strings included) for the whole batch
+        values = [list(map(frame.get, self.tags, repeat(nan))) for frame in frames]
+        try:
+            out[...] = np.array(values, dtype=np.float32).reshape(len(frames), self.num_features)
+        except (TypeError, ValueError):
+            # Some reading is not a number: convert value by value, bad ones become missing
+            out[...] = [[_reading(value) for value in row] for row in values]
+
+        missing = np.isnan(out)
+        if missing.any():
+            np.copyto(out, np.broadcast_to(self.mean, out.shape), where=missing)
+
+        out -= self.mean
+        out *= self.inv_std
+        return out
+
+    def pack_columns(self, columns: Mapping[str, Sequence[float]], rows: int) -> np.ndarray:
+        """
+        Pack column-oriented data (e.g. a DataFrame chunk) into a new normalized array
+
+        Columns are looked up by tag; absent columns and NaN readings are
+        filled with the tag mean like pack() does for frames.
+        """
+        out = np.empty((rows, self.num_features), dtype=np.float32)
+        for i, tag in enumerate(self.tags):
+            column = columns[tag] if tag in columns else None
+            out[:, i] = self.mean[i] if column is None else np.asarray(column, dtype=np.float32)
+
+        missing = np.isnan(out)
+        if missing.any():
+            np.copyto(out, np.broadcast_to(self.mean, out.shape), where=missing)
+
+        out -= self.mean
+        out *= self.inv_std
+        return out
+
+    def to_dict(self) -> Dict:
+        return {"tags": self.tags, "mean": self.mean.tolist(), "std": self.std.tolist()}
+
+    def save(self, model_path: str):
+        """Write this schema as the normalization file for a checkpoint"""
+        with open(normalization_path(model_path), "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+def invalid_readings(frame: Mapping, tags: Sequence[str] = SWAT_TAGS) -> List[str]:
+    """Tags of a frame whose value is neither None, a number nor a numeric string"""
+    return [tag for tag in tags if tag in frame and not _is_reading(frame[tag])]
+
+def _is_reading(value) -> bool:
+    if value is None or isinstance(value, (int, float)):
+        return True
+    if isinstance(value, str):
+        try:
+            float(value)
+            return True
+        except ValueError:
+            return False
+    return False
+
+def _reading(value) -> float:
+    """A reading as float, NaN (missing) when it cannot be parsed"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+def normalization_path(model_path: str) -> str:
+    """Path of the normalization file that belongs to a checkpoint"""
+    return os.path.splitext(model_path.rstrip("/\\"))[0] + ".norm.json"
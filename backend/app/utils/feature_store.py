@@ -0,0 +1,177 @@
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+import numpy as np
+from app.utils.feature_schema import SWAT_TAGS, FeatureSchema
+from app.utils.windowing import rolling_mean
+
+META_FILE = "meta.json"
+TIMESTAMPS_FILE = "timestamps.i8"
+LABELS_FILE = "attack.u1"
+
+TimeLike = Union[str, datetime, np.datetime64, int]
+
+def _column_file(tag: str) -> str:
+    return f"{tag}.f32"
+
+def to_nanoseconds(value: TimeLike) -> int:
+    """Nanoseconds since the epoch (UTC) for a timestamp, ISO string or datetime"""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return int(np.datetime64(value, "ns").astype(np.int64))
+
+class FeatureStore:
+    """
+    Memory-mapped columnar store of sensor history
+
+    A store is a directory with one raw float32 file per tag, an int64
+    timestamp index (ns since the epoch, non-decreasing) and optional uint8
+    attack labels, all of the same length, plus meta.json. Columns are
+    opened with np.memmap, so slicing a time range reads only those pages
+    and never copies until the rows are packed for the model.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.tags: List[str] = self.meta["tags"]
+        self.rows: int = self.meta["rows"]
+
+        self.timestamps = self._map(TIMESTAMPS_FILE, np.int64)
+        self._columns: Dict[str, np.ndarray] = {}
+        self.labels = self._map(LABELS_FILE, np.uint8) if self.meta.get("labels") else None
+
+    def _map(self, name: str, dtype) -> np.ndarray:
+        if self.rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.path, name), dtype=dtype, mode="r", shape=(self.rows,))
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def column(self, tag: str) -> np.ndarray:
+        """Whole memory-mapped column of a tag"""
+        if tag not in self._columns:
+            if tag not in self.tags:
+                raise KeyError(f"Tag {tag} not in feature store")
+            self._columns[tag] = self._map(_column_file(tag), np.float32)
+        return self._columns[tag]
+
+    def time_slice(self, start: Optional[TimeLike] = None, end: Optional[TimeLike] = None) -> slice:
+        """Row range with start <= timestamp < end (open-ended when None)"""
+        first = 0 if start is None else int(np.searchsorted(self.timestamps, to_nanoseconds(start), side="left"))
+        last = self.rows if end is None else int(np.searchsorted(self.timestamps, to_nanoseconds(end), side="left"))
+        return slice(first, max(first, last))
+
+    def columns(self, rows: slice, tags: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """Zero-copy views of the given tags (all by default) over a row range"""
+        return {tag: self.column(tag)[rows] for tag in (tags or self.tags)}
+
+    def packed(self, schema: FeatureSchema, rows: slice) -> np.ndarray:
+        """Model inputs (rows, num_features) for a row range, normalized with the schema"""
+        present = [tag for tag in schema.tags if tag in self.tags]
+        return schema.pack_columns(self.columns(rows, present), rows.stop - rows.start)
+
+    def windowed(self, schema: FeatureSchema, rows: slice, window_size: int) -> np.ndarray:
+        """
+        Sliding-window model inputs for a row range, as the windowed endpoint computes them
+
+        The window_size - 1 rows before the range warm the window up, so the
+        first row of the range already sees a full window when history exists.
+        """
+        warm = min(rows.start, window_size - 1)
+        packed = self.packed(schema, slice(rows.start - warm, rows.stop))
+        return rolling_mean(packed, window_size, warm)
+
+    def iter_chunks(self, rows: slice, chunk_rows: int) -> Iterator[slice]:
+        """Split a row range into consecutive slices of at most chunk_rows rows"""
+        for start in range(rows.start, rows.stop, chunk_rows):
+            yield slice(start, min(start + chunk_rows, rows.stop))
+
+class FeatureStoreWriter:
+    """
+    Appends sensor history to a feature store directory
+
+    Rows are appended to the column files chunk by chunk, so a dataset of
+    any size is converted with bounded memory. meta.json is written on
+    close(), which makes the appended rows visible to readers.
+    """
+
+    def __init__(self, path: str, tags: Sequence[str] = SWAT_TAGS, labels: bool = False, append: bool = False):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        self.rows = 0
+        self.last_timestamp: Optional[int] = None
+        meta_path = os.path.join(path, META_FILE)
+        append = append and os.path.exists(meta_path)
+        if append:
+            store = FeatureStore(path)
+            tags, labels, self.rows = store.tags, store.labels is not None, store.rows
+            if self.rows:
+                self.last_timestamp = int(store.timestamps[-1])
+            del store
+        elif os.path.exists(meta_path):
+            raise FileExistsError(f"Feature store already exists at {path}")
+
+        self.tags = list(tags)
+        self.labels = labels
+        files = {_column_file(tag): 4 for tag in self.tags}
+        files[TIMESTAMPS_FILE] = 8
+        if labels:
+            files[LABELS_FILE] = 1
+        if append:
+            # Drop rows of an interrupted import that never made it into meta.json
+            for name, itemsize in files.items():
+                os.truncate(os.path.join(path, name), self.rows * itemsize)
+
+        mode = "ab" if append else "wb"
+        self._files = {tag: open(os.path.join(path, _column_file(tag)), mode) for tag in self.tags}
+        self._timestamps = open(os.path.join(path, TIMESTAMPS_FILE), mode)
+        self._labels = open(os.path.join(path, LABELS_FILE), mode) if labels else None
+
+    def append(self, timestamps: np.ndarray, columns: Dict[str, np.ndarray], attacks: Optional[np.ndarray] = None):
+        """Append rows; timestamps (ns) must not go backwards, missing tags are stored as NaN"""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        if not len(timestamps):
+            return
+        if np.any(np.diff(timestamps) < 0) or (self.last_timestamp is not None and timestamps[0] < self.last_timestamp):
+            raise ValueError("Timestamps must be non-decreasing")
+
+        for tag, f in self._files.items():
+            column = columns.get(tag)
+            values = np.full(len(timestamps), np.nan, dtype=np.float32) if column is None else np.asarray(column, dtype=np.float32)
+            f.write(np.ascontiguousarray(values).tobytes())
+        self._timestamps.write(timestamps.tobytes())
+        if self._labels is not None:
+            flags = np.zeros(len(timestamps), dtype=np.uint8) if attacks is None else np.asarray(attacks, dtype=np.uint8)
+            self._labels.write(flags.tobytes())
+
+        self.rows += len(timestamps)
+        self.last_timestamp = int(timestamps[-1])
+
+    def close(self, commit: bool = True):
+        """Close the column files and, unless aborting, publish the appended rows"""
+        for f in self._files.values():
+            f.close()
+        self._timestamps.close()
+        if self._labels is not None:
+            self._labels.close()
+
+        if not commit:
+            return
+        # Written then renamed so readers never see a partial meta.json
+        meta_path = os.path.join(self.path, META_FILE)
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({"tags": self.tags, "rows": self.rows, "labels": self.labels, "dtype": "float32"}, f, indent=2)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def __enter__(self) -> "FeatureStoreWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
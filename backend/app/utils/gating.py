@@ -0,0 +1,153 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.config import settings
+from app.utils.feature_schema import FeatureSchema
+from app.utils.metrics import metrics
+
+class _StreamState:
+    __slots__ = ("reference", "skipped", "last_result", "result_seq", "in_flight")
+
+    def __init__(self):
+        self.reference: Optional[np.ndarray] = None
+        self.skipped = 0
+        self.last_result: Optional[Dict] = None
+        # Plan sequence number that produced last_result
+        self.result_seq = 0
+        # Latest plan with a score of this stream in flight
+        self.in_flight: Optional["GatePlan"] = None
+
+class GatePlan:
+    """Which frames of a batch to score and where every frame's verdict comes from"""
+
+    __slots__ = ("seq", "score_rows", "sources", "reused", "pending", "states")
+
+    def __init__(self, seq: int):
+        self.seq = seq
+        self.score_rows: List[int] = []
+        # Per frame: index into the scored results, or -1 to reuse reused[frame]
+        self.sources: List[int] = []
+        self.reused: Dict[int, Dict] = {}
+        # Per stream scored in this plan: its latest index into the scored results
+        self.pending: Dict[str, int] = {}
+        self.states: Dict[str, _StreamState] = {}
+
+class ChangeGate:
+    """
+    Change-detection pre-filter that skips inference on steady-state frames
+
+    Each stream keeps the packed vector of the last frame that was scored.
+    A new frame is only sent to the model when some feature moved by more
+    than `threshold` standard deviations from that reference, or after
+    max_skip consecutive frames were skipped; otherwise the stream's last
+    verdict is reused. Streams are bounded by max_streams (LRU).
+    """
+
+    def __init__(self, schema: FeatureSchema, threshold: float = 0.1, max_skip: int = 10, max_streams: int = 1000):
+        self.schema = schema
+        self.threshold = threshold
+        self.max_skip = max(0, max_skip)
+        self.max_streams = max(1, max_streams)
+        self._streams: "OrderedDict[str, _StreamState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._seq = 0
+
+        self.frames = metrics.counter("gate_frames_total", "Frames seen by the change-detection gate")
+        self.skipped = metrics.counter("gate_skipped_total", "Frames answered with the previous verdict")
+        self.skip_ratio = metrics.gauge("gate_skip_ratio", "Fraction of gated frames that skipped inference")
+
+    def set_schema(self, schema: FeatureSchema):
+        """Switch to another model's schema; references are dropped since units may differ"""
+        with self._lock:
+            self.schema = schema
+            self._streams.clear()
+
+    def _state(self, stream_id: str) -> _StreamState:
+        state = self._streams.get(stream_id)
+        if state is None:
+            state = _StreamState()
+            self._streams[stream_id] = state
+            while len(self._streams) > self.max_streams:
+                self._streams.popitem(last=False)
+        else:
+            self._streams.move_to_end(stream_id)
+        return state
+
+    def plan(self, items: List[Tuple[str, Dict]]) -> GatePlan:
+        """Decide which (stream_id, sensor_data) frames need a forward pass"""
+        packed = self.schema.pack([frame for _, frame in items])
+
+        with self._lock:
+            self._seq += 1
+            plan = GatePlan(self._seq)
+            for i, (stream_id, _) in enumerate(items):
+                state = self._state(stream_id)
+                row = packed[i]
+                local = plan.pending.get(stream_id)
+                changed = (
+                    state.reference is None
+                    or (local is None and state.last_result is None)
+                    # Another plan's score of this stream is still in flight, so the
+                    # reference is not backed by a verdict this plan can use
+                    or (local is None and state.in_flight is not None)
+                    or state.skipped >= self.max_skip
+                    # Largest per-feature change, in standard deviations
+                    or float(np.abs(row - state.reference).max()) > self.threshold
+                )
+
+                if changed:
+                    state.reference = row.copy()
+                    state.skipped = 0
+                    state.in_flight = plan
+                    plan.pending[stream_id] = len(plan.score_rows)
+                    plan.states[stream_id] = state
+                    plan.sources.append(len(plan.score_rows))
+                    plan.score_rows.append(i)
+                elif local is not None:
+                    # Same stream was scored earlier in this batch
+                    state.skipped += 1
+                    plan.sources.append(local)
+                else:
+                    state.skipped += 1
+                    plan.sources.append(-1)
+                    plan.reused[i] = state.last_result
+
+        self.frames.inc(len(items))
+        self.skipped.inc(len(items) - len(plan.score_rows))
+        self.skip_ratio.set(self.skipped.value / self.frames.value if self.frames.value else 0.0)
+        return plan
+
+    def complete(self, plan: GatePlan, scored: List[Dict]) -> List[Dict]:
+        """Verdicts for every frame of the batch, given results for plan.score_rows"""
+        with self._lock:
+            for stream_id, row in plan.pending.items():
+                state = plan.states[stream_id]
+                # A newer plan that completed first keeps its (more recent) verdict
+                if plan.seq > state.result_seq:
+                    state.last_result = scored[row]
+                    state.result_seq = plan.seq
+                if state.in_flight is plan:
+                    state.in_flight = None
+
+        return [
+            {**(scored[source] if source >= 0 else plan.reused[i]), "gated": source < 0 or plan.score_rows[source] != i}
+            for i, source in enumerate(plan.sources)
+        ]
+
+    def abort(self, plan: GatePlan):
+        """Scoring failed: forget the references set by this plan so the frames are retried"""
+        with self._lock:
+            for state in plan.states.values():
+                if state.in_flight is plan:
+                    state.reference = None
+                    state.in_flight = None
+
+def create_change_gate(schema: FeatureSchema) -> ChangeGate:
+    """Build a change-detection gate using the configured thresholds"""
+    return ChangeGate(
+        schema,
+        threshold=settings.GATE_THRESHOLD,
+        max_skip=settings.GATE_MAX_SKIP,
+        max_streams=settings.GATE_MAX_STREAMS
+    )
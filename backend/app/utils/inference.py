@@ -0,0 +1,129 @@
+import numpy as np
+from typing import Dict, List, Optional
+from app.config import settings
+from app.utils.topology import topology_registry
+
+# Anomaly-class probability above which a frame is flagged
+ANOMALY_THRESHOLD = 0.5
+
+class InferenceEngine:
+    """
+    Prediction flow shared by the torch and NumPy engines
+
+    Subclasses load the network and implement predict_packed(); packing,
+    turning probabilities and attribution scores into anomalies, and the
+    topology rendering live here so both engines report identically.
+    """
+
+    backend_name = "eager"
+
+    def __init__(self):
+        self.model_path: Optional[str] = None
+        self.schema = None
+        self.weights_loaded = False
+        self.parity: Optional[Dict] = None
+
+    def predict(self, sensor_data: Dict) -> Dict:
+        """
+        Make predictions on sensor data
+
+        Args:
+            sensor_data: Dictionary containing sensor readings
+
+        Returns:
+            Dictionary with anomaly predictions and topology
+        """
+        return self.predict_batch([sensor_data])[0]
+
+    def predict_batch(self, sensor_frames: List[Dict]) -> List[Dict]:
+        """
+        Make predictions on several sensor frames with a single forward pass
+
+        Args:
+            sensor_frames: List of dictionaries containing sensor readings
+
+        Returns:
+            List of dictionaries with anomaly predictions and topology,
+            in the same order as the input frames
+        """
+        if not sensor_frames:
+            return []
+
+        # Errors propagate: a failed forward pass must never look like "no anomaly"
+        return self.predict_packed(self.schema.pack(sensor_frames))
+
+    def predict_packed(self, inputs: np.ndarray) -> List[Dict]:
+        """
+        Make predictions on already packed and normalized model inputs
+
+        Args:
+            inputs: (batch, 51) float32 array in schema column order, e.g.
+                window features built by the sliding-window manager
+
+        Returns:
+            List of dictionaries with anomaly predictions and topology
+        """
+        raise NotImplementedError
+
+    def anomaly_probabilities(self, inputs: np.ndarray) -> np.ndarray:
+        """Anomaly-class probability of each packed input row, without attribution (bulk scoring)"""
+        raise NotImplementedError
+
+    def warmup(self, batch_sizes=(1, 32), rounds: int = 3):
+        """Run dummy forward passes so the first real request does not pay first-call overhead"""
+        for _ in range(rounds):
+            for size in batch_sizes:
+                self.predict_packed(np.zeros((size, self.schema.num_features), dtype=np.float32))
+
+    def _results(self, anomaly_probs: List[float], scores: Dict[int, np.ndarray]) -> List[Dict]:
+        """Per-frame results from anomaly probabilities and attribution scores of flagged frames"""
+        results = []
+        for i, anomaly_prob in enumerate(anomaly_probs):
+            anomalies = self._process_predictions(anomaly_prob, scores.get(i))
+            results.append({
+                "anomalies": anomalies,
+                "topology": self._generate_topology(anomalies)
+            })
+        return results
+
+    def _process_predictions(self, anomaly_prob: float, scores: Optional[np.ndarray] = None) -> List[Dict]:
+        """Turn a frame's anomaly probability and sensor scores into anomalies per node"""
+        if anomaly_prob <= ANOMALY_THRESHOLD:
+            return []
+
+        severity = "high" if anomaly_prob > 0.8 else "medium"
+        if scores is None:
+            # No attribution: report against the whole plant
+            return [{"node_id": "SCADA", "confidence": anomaly_prob, "severity": severity}]
+
+        # Report the top sensors, keeping those within ATTRIBUTION_MIN_SHARE of the strongest
+        top = np.argsort(scores)[::-1][:settings.ATTRIBUTION_TOP_K]
+        cutoff = scores[top[0]] * settings.ATTRIBUTION_MIN_SHARE
+        return [
+            {
+                "node_id": self.schema.tags[i],
+                "confidence": anomaly_prob,
+                "severity": severity,
+                "attribution": round(float(scores[i]), 6)
+            }
+            for rank, i in enumerate(top)
+            if rank == 0 or (scores[i] > 0 and scores[i] >= cutoff)
+        ]
+
+    def _generate_topology(self, anomalies: List[Dict]) -> Dict:
+        """Generate network topology with anomaly status"""
+        return topology_registry.render(anomaly["node_id"] for anomaly in anomalies)
+
+def create_inference(model_path: Optional[str] = None, strict: bool = False, backend: Optional[str] = None) -> InferenceEngine:
+    """
+    Build the inference engine for a checkpoint
+
+    The numpy backend never imports torch; every other backend goes through
+    the torch ModelInference.
+    """
+    if (backend or settings.INFERENCE_BACKEND) == "numpy":
+        from app.utils.numpy_engine import NumpyModelInference
+        return NumpyModelInference(model_path, strict)
+
+    from app.utils.model_loader import ModelInference
+    return ModelInference(model_path, strict, backend)
@@ -1,7 +1,12 @@
 import torch
 import torch.nn as nn
-from typing import Dict, List
+import numpy as np
+from typing import Dict, List, Optional
 import os
+from app.config import settings
+from app.utils.backends import InferenceBackend, create_backend, verify_parity
+from app.utils.feature_schema import DEFAULT_MODEL_PATH, FeatureSchema
+from app.utils.inference import ANOMALY_THRESHOLD, InferenceEngine
 
 class DQNModel(nn.Module):
     """Deep Q-Network model for anomaly detection"""
@@ -18,21 +23,36 @@ class DQNModel(nn.Module):
     def forward(self, x):
         return self.network(x)
 
-class ModelInference:
+class ModelInference(InferenceEngine):
     """Handle model loading and inference"""
     
-    def __init__(self, model_path: str = None):
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    def __init__(self, model_path: str = None, strict: bool = False, backend: Optional[str] = None):
+        super().__init__()
+        self.backend_name = backend or settings.INFERENCE_BACKEND
+        # Exported/quantized backends are CPU-only
+        use_cuda = torch.cuda.is_available() and self.backend_name == "eager"
+        self.device = torch.device("cuda" if use_cuda else "cpu")
         self.model = None
         
         if model_path is None:
             # Default path to the model
-            model_path = os.path.join(os.path.dirname(__file__), "../../..", "swat_fdai_model_final.pth")
+            model_path = DEFAULT_MODEL_PATH
+        self.model_path = model_path
         
-        self.load_model(model_path)
+        # Tag -> column mapping and normalization vector stored next to the checkpoint
+        self.schema = FeatureSchema.for_checkpoint(model_path)
+        self.load_model(model_path, strict)
+        self.backend = self._build_backend(model_path, strict)
+        self.backend_name = self.backend.name
     
-    def load_model(self, model_path: str):
-        """Load the trained PyTorch model"""
+    def load_model(self, model_path: str, strict: bool = False):
+        """
+        Load the trained PyTorch model
+        
+        With strict=False a missing or unreadable checkpoint falls back to an
+        untrained model (demo mode); with strict=True the error is raised so
+        a bad checkpoint can never replace a working one.
+        """
         try:
             # Initialize model architecture
             self.model = DQNModel()
@@ -43,101 +63,100 @@ class ModelInference:
                 self.model.load_state_dict(checkpoint)
                 self.model.to(self.device)
                 self.model.eval()
+                self.weights_loaded = True
                 print(f"Model loaded successfully from {model_path}")
             else:
+                if strict:
+                    raise FileNotFoundError(f"Model file not found at {model_path}")
                 print(f"Warning: Model file not found at {model_path}")
                 print("Using untrained model for demo purposes")
         except Exception as e:
+            if strict:
+                raise
             print(f"Error loading model: {e}")
             print("Using untrained model for demo purposes")
+        
+        self.model.eval()
     
-    def predict(self, sensor_data: Dict) -> Dict:
+    def _build_backend(self, model_path: str, strict: bool) -> InferenceBackend:
         """
-        Make predictions on sensor data
+        Build the configured backend and check it against eager
         
-        Args:
-            sensor_data: Dictionary containing sensor readings
-            
-        Returns:
-            Dictionary with anomaly predictions and topology
+        A backend that fails to build or disagrees with eager beyond its
+        tolerance (e.g. a stale export of another checkpoint) is replaced by
+        eager, or raises with strict=True.
         """
+        eager = create_backend("eager", self.model, model_path, self.schema.num_features)
+        if self.backend_name == "eager":
+            return eager
+        
         try:
-            # Convert sensor data to tensor (adjust based on your actual data format)
-            # This is a placeholder - adjust according to your actual sensor data structure
-            input_tensor = self._preprocess_data(sensor_data)
-            
-            with torch.no_grad():
-                output = self.model(input_tensor)
-                predictions = torch.softmax(output, dim=-1)
-            
-            # Process predictions (placeholder logic)
-            anomalies = self._process_predictions(predictions, sensor_data)
-            topology = self._generate_topology(anomalies)
-            
-            return {
-                "anomalies": anomalies,
-                "topology": topology
-            }
+            backend = create_backend(self.backend_name, self.model, model_path, self.schema.num_features)
+            self.parity = verify_parity(
+                backend, self.model, self.schema.num_features, settings.INFERENCE_PARITY_TOLERANCE
+            )
+            if not self.parity["ok"]:
+                raise ValueError(
+                    f"{self.backend_name} backend differs from eager by {self.parity['max_abs_error']:.6f} "
+                    f"(tolerance {self.parity['tolerance']})"
+                )
+            print(f"Using {self.backend_name} inference backend (max error {self.parity['max_abs_error']:.2e})")
+            return backend
         except Exception as e:
-            print(f"Prediction error: {e}")
-            return {
-                "anomalies": [],
-                "topology": {"nodes": [], "edges": []}
-            }
-    
-    def _preprocess_data(self, sensor_data: Dict) -> torch.Tensor:
-        """Preprocess sensor data for model input"""
-        # Placeholder - adjust based on your actual data format
-        # Assuming 51 features as per the model
-        values = list(sensor_data.values())[:51]
-        while len(values) < 51:
-            values.append(0.0)
-        
-        tensor = torch.tensor(values, dtype=torch.float32).unsqueeze(0)
-        return tensor.to(self.device)
+            if strict:
+                raise
+            print(f"Error building {self.backend_name} backend: {e}")
+            print("Using eager inference backend")
+            return eager
     
-    def _process_predictions(self, predictions: torch.Tensor, sensor_data: Dict) -> List[Dict]:
-        """Process model predictions into anomaly list"""
-        # Placeholder logic
-        anomalies = []
+    def predict_packed(self, inputs: np.ndarray) -> List[Dict]:
+        """Score packed model inputs with the torch backend"""
+        # from_numpy shares the caller's buffer; no extra copy on CPU
+        input_tensor = torch.from_numpy(inputs).to(self.device)
         
-        # Example: if anomaly probability > threshold
-        anomaly_prob = predictions[0][1].item()  # Assuming index 1 is anomaly class
-        
-        if anomaly_prob > 0.5:
-            anomalies.append({
-                "node_id": "sensor_node_1",
-                "confidence": anomaly_prob,
-                "severity": "high" if anomaly_prob > 0.8 else "medium"
-            })
+        with torch.no_grad():
+            predictions = self._forward(input_tensor)
+            anomaly_probs = predictions[:, 1]  # index 1 is the anomaly class
+            
+            # Attribute flagged frames to sensors in one extra vectorized pass
+            flagged = torch.nonzero(anomaly_probs > ANOMALY_THRESHOLD).flatten()
+            scores = {}
+            if settings.ATTRIBUTION_ENABLED and len(flagged):
+                flagged_scores = self._attribute(input_tensor[flagged.to(input_tensor.device)], anomaly_probs[flagged])
+                scores = dict(zip(flagged.tolist(), flagged_scores.numpy()))
         
-        return anomalies
+        return self._results(anomaly_probs.tolist(), scores)
     
-    def _generate_topology(self, anomalies: List[Dict]) -> Dict:
-        """Generate network topology with anomaly status"""
-        # Placeholder topology - replace with actual GNN topology
-        nodes = []
-        for i in range(10):  # Example: 10 nodes
-            node_id = f"node_{i}"
-            is_anomaly = any(a["node_id"] == node_id for a in anomalies)
-            
-            nodes.append({
-                "id": node_id,
-                "label": f"Sensor {i}",
-                "status": "anomaly" if is_anomaly else "normal",
-                "x": (i % 5) * 100,
-                "y": (i // 5) * 100
-            })
+    def anomaly_probabilities(self, inputs: np.ndarray) -> np.ndarray:
+        with torch.no_grad():
+            return self._forward(torch.from_numpy(inputs).to(self.device))[:, 1].cpu().numpy()
+    
+    def _preprocess_data(self, sensor_data: Dict) -> torch.Tensor:
+        """Preprocess a single sensor frame for model input"""
+        return self._preprocess_batch([sensor_data])
+    
+    def _preprocess_batch(self, sensor_frames: List[Dict]) -> torch.Tensor:
+        """Pack sensor frames into a normalized (batch, 51) tensor by SWaT tag"""
+        # from_numpy shares the schema's preallocated buffer; no extra copy on CPU
+        return torch.from_numpy(self.schema.pack(sensor_frames)).to(self.device)
+    
+    def _forward(self, input_tensor: torch.Tensor) -> torch.Tensor:
+        """Class probabilities (on CPU) for a batch of packed inputs"""
+        return torch.softmax(self.backend(input_tensor), dim=-1).cpu()
+    
+    def _attribute(self, inputs: torch.Tensor, anomaly_probs: torch.Tensor) -> torch.Tensor:
+        """
+        Per-sensor anomaly scores by vectorized leave-one-feature-out occlusion
         
-        # Example edges
-        edges = [
-            {"source": "node_0", "target": "node_1"},
-            {"source": "node_1", "target": "node_2"},
-            {"source": "node_2", "target": "node_3"},
-            # Add more edges based on your actual topology
-        ]
+        For n frames of f features, builds an (n * f, f) batch where copy k of a
+        frame has feature k reset to its normal value (0 after standardization,
+        i.e. the training mean) and scores it in one forward pass. A sensor's
+        score is how much the anomaly probability drops without its reading.
+        """
+        n, f = inputs.shape
+        occluded = inputs.unsqueeze(1).repeat(1, f, 1)
+        diagonal = torch.arange(f, device=inputs.device)
+        occluded[:, diagonal, diagonal] = 0.0
         
-        return {"nodes": nodes, "edges": edges}
-
-# Global model instance
-model_inference = ModelInference()
+        occluded_probs = self._forward(occluded.reshape(n * f, f))[:, 1].reshape(n, f)
+        return anomaly_probs.unsqueeze(1) - occluded_probs
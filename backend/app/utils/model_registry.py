@@ -0,0 +1,204 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+from app.config import settings
+from app.utils.feature_schema import DEFAULT_MODEL_PATH
+
+if TYPE_CHECKING:
+    from app.utils.inference import InferenceEngine
+
+logger = logging.getLogger(__name__)
+
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+class ModelVersion:
+    """One checkpoint known to the registry and its load/warmup bookkeeping"""
+
+    def __init__(self, version: str, path: str):
+        self.version = version
+        self.path = path
+        self.status = LOADING
+        self.model: Optional["InferenceEngine"] = None
+        self.error: Optional[str] = None
+        self.load_ms: Optional[float] = None
+        self.warmup_ms: Optional[float] = None
+        self.loaded_at: Optional[datetime] = None
+        self.activated_at: Optional[datetime] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": self.version,
+            "path": self.path,
+            "status": self.status,
+            "weights_loaded": bool(self.model and self.model.weights_loaded),
+            "backend": self.model.backend_name if self.model else None,
+            "parity": self.model.parity if self.model else None,
+            "error": self.error,
+            "load_ms": self.load_ms,
+            "warmup_ms": self.warmup_ms,
+            "loaded_at": self.loaded_at,
+            "activated_at": self.activated_at
+        }
+
+class ModelRegistry:
+    """
+    Loaded checkpoint versions and the one currently serving traffic
+
+    New versions are loaded strictly (a bad checkpoint fails instead of
+    falling back to an untrained model) and warmed up before they can be
+    activated. Activation is a single reference swap under a lock: every
+    batch reads current() once, so in-flight batches finish on the model
+    they started with and the next batch uses the new one. Previously
+    active versions stay loaded (up to MODEL_REGISTRY_MAX_VERSIONS) so a
+    rollback is another swap, not a reload.
+
+    Nothing is loaded at construction: torch and the startup checkpoint are
+    imported on the first current() call or by ensure_loaded() from a
+    background startup task, whichever comes first.
+    """
+
+    def __init__(self, model_dir: Optional[str] = None, max_versions: int = 3):
+        self.model_dir = os.path.abspath(model_dir or os.path.dirname(DEFAULT_MODEL_PATH))
+        self.max_versions = max(2, max_versions)
+        self._versions: Dict[str, ModelVersion] = {}
+        self._active: Optional[ModelVersion] = None
+        self._history: List[str] = []
+        self._lock = threading.Lock()
+        self._startup_lock = threading.Lock()
+        self._listeners: List[Callable[[ModelVersion], None]] = []
+
+    def resolve_path(self, path: str) -> str:
+        """Checkpoint path inside the model directory (checkpoints are pickles, so nothing outside it is loaded)"""
+        resolved = os.path.abspath(os.path.join(self.model_dir, path))
+        if os.path.commonpath([resolved, self.model_dir]) != self.model_dir:
+            raise ValueError("Checkpoint path must be inside the model directory")
+        return resolved
+
+    def on_activate(self, listener: Callable[[ModelVersion], None]):
+        """Call listener(version) after every activation or rollback"""
+        self._listeners.append(listener)
+
+    def load(self, version: str, path: str, strict: bool = True) -> ModelVersion:
+        """Load and warm up a checkpoint version (blocking; run it off the event loop)"""
+        with self._lock:
+            existing = self._versions.get(version)
+            if existing is not None and existing.status != FAILED:
+                raise ValueError(f"Model version {version} already exists")
+            entry = ModelVersion(version, path)
+            self._versions[version] = entry
+
+        try:
+            started = time.perf_counter()
+            # Deferred so importing the registry does not import torch
+            from app.utils.inference import create_inference
+            model = create_inference(path, strict=strict)
+            entry.load_ms = round((time.perf_counter() - started) * 1000.0, 3)
+
+            started = time.perf_counter()
+            model.warmup((1, settings.BATCH_MAX_SIZE))
+            entry.warmup_ms = round((time.perf_counter() - started) * 1000.0, 3)
+
+            entry.model = model
+            entry.loaded_at = datetime.now(timezone.utc)
+            entry.status = READY
+            logger.info(f"Model version {version} ready (load {entry.load_ms} ms, warmup {entry.warmup_ms} ms)")
+        except Exception as e:
+            entry.status = FAILED
+            entry.error = str(e)
+            logger.error(f"Model version {version} failed to load: {str(e)}")
+        return entry
+
+    def activate(self, version: str) -> ModelVersion:
+        """Atomically make a ready version the one serving traffic"""
+        with self._lock:
+            entry = self._versions.get(version)
+            if entry is None:
+                raise KeyError(version)
+            if entry.status != READY:
+                raise ValueError(f"Model version {version} is {entry.status}, not ready")
+            if self._active is entry:
+                return entry
+
+            if self._active is not None:
+                self._history.append(self._active.version)
+            self._active = entry
+            entry.activated_at = datetime.now(timezone.utc)
+            self._evict_locked()
+
+        self._notify(entry)
+        return entry
+
+    def rollback(self) -> ModelVersion:
+        """Swap back to the previously active version"""
+        with self._lock:
+            while self._history:
+                entry = self._versions.get(self._history.pop())
+                if entry is not None and entry.status == READY:
+                    self._active = entry
+                    entry.activated_at = datetime.now(timezone.utc)
+                    break
+            else:
+                raise ValueError("No previous model version to roll back to")
+
+        self._notify(entry)
+        return entry
+
+    def _evict_locked(self):
+        """Drop the oldest inactive versions beyond max_versions"""
+        keep = {self._active.version} | set(self._history[-(self.max_versions - 1):])
+        for version in list(self._versions):
+            entry = self._versions[version]
+            if version not in keep and entry.status != LOADING and len(self._versions) > self.max_versions:
+                del self._versions[version]
+        self._history = [version for version in self._history if version in self._versions]
+
+    def _notify(self, entry: ModelVersion):
+        for listener in self._listeners:
+            try:
+                listener(entry)
+            except Exception as e:
+                logger.error(f"Model activation listener failed: {str(e)}")
+
+    def get(self, version: str) -> Optional[ModelVersion]:
+        return self._versions.get(version)
+
+    @property
+    def active(self) -> Optional[ModelVersion]:
+        return self._active
+
+    @property
+    def ready(self) -> bool:
+        return self._active is not None
+
+    def ensure_loaded(self, version: Optional[str] = None) -> ModelVersion:
+        """Load and activate the startup checkpoint unless a version is already active (blocking)"""
+        with self._startup_lock:
+            if self._active is None:
+                version = version or settings.MODEL_DEFAULT_VERSION
+                # The startup model keeps the demo fallback to an untrained network
+                self.load(version, DEFAULT_MODEL_PATH, strict=False)
+                self.activate(version)
+        return self._active
+
+    def current(self) -> "InferenceEngine":
+        """Model serving traffic right now (read once per batch; loads the startup model on first use)"""
+        active = self._active
+        if active is None:
+            active = self.ensure_loaded()
+        return active.model
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "active": self._active.version if self._active else None,
+                "history": list(self._history),
+                "versions": [entry.to_dict() for entry in self._versions.values()]
+            }
+
+# Global model registry (empty until the first prediction or startup preload)
+model_registry = ModelRegistry(settings.MODEL_REGISTRY_DIR, settings.MODEL_REGISTRY_MAX_VERSIONS)
@@ -0,0 +1,113 @@
+import os
+from typing import Dict, List
+import numpy as np
+from app.config import settings
+from app.utils.feature_schema import DEFAULT_MODEL_PATH, FeatureSchema
+from app.utils.inference import ANOMALY_THRESHOLD, InferenceEngine
+
+# DQNModel layer sizes: 51 -> 128 -> 128 -> 2
+LAYER_SIZES = (51, 128, 128, 2)
+
+def weights_path(model_path: str) -> str:
+    """Path of the NumPy weights file exported next to a checkpoint"""
+    return os.path.splitext(model_path.rstrip("/\\"))[0] + ".npz"
+
+class NumpyModelInference(InferenceEngine):
+    """
+    Torch-free inference engine for lightweight (edge) workers
+
+    The DQN MLP is three matmuls and two ReLUs, so it runs as vectorized
+    NumPy on weights exported once from the checkpoint into a compact .npz
+    (python -m app.tools.export_model --backends numpy). Weights are stored
+    pre-transposed and C-contiguous so every layer is a single x @ W + b.
+    """
+
+    backend_name = "numpy"
+
+    def __init__(self, model_path: str = None, strict: bool = False):
+        super().__init__()
+        if model_path is None:
+            model_path = DEFAULT_MODEL_PATH
+        self.model_path = model_path
+
+        self.schema = FeatureSchema.for_checkpoint(model_path)
+        self.layers = self.load_weights(model_path, strict)
+
+    def load_weights(self, model_path: str, strict: bool = False):
+        """Load (W, b) pairs from the exported .npz, or random weights in demo mode"""
+        path = weights_path(model_path)
+        try:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"NumPy weights not found at {path}")
+            with np.load(path) as data:
+                count = len([key for key in data.files if key.startswith("w")])
+                layers = [
+                    (np.ascontiguousarray(data[f"w{i}"], dtype=np.float32), np.asarray(data[f"b{i}"], dtype=np.float32))
+                    for i in range(count)
+                ]
+            if layers[0][0].shape[0] != self.schema.num_features:
+                raise ValueError(f"Weights expect {layers[0][0].shape[0]} inputs, schema has {self.schema.num_features}")
+            self.weights_loaded = True
+            print(f"Model weights loaded successfully from {path}")
+            return layers
+        except Exception as e:
+            if strict:
+                raise
+            print(f"Error loading model weights: {e}")
+            print("Using untrained model for demo purposes")
+
+        # Same uniform(-1/sqrt(fan_in), 1/sqrt(fan_in)) init as nn.Linear
+        rng = np.random.default_rng()
+        layers = []
+        for fan_in, fan_out in zip(LAYER_SIZES, LAYER_SIZES[1:]):
+            bound = 1.0 / np.sqrt(fan_in)
+            layers.append((
+                rng.uniform(-bound, bound, (fan_in, fan_out)).astype(np.float32),
+                rng.uniform(-bound, bound, fan_out).astype(np.float32)
+            ))
+        return layers
+
+    def logits(self, inputs: np.ndarray) -> np.ndarray:
+        """Raw network output for a (batch, features) float32 array"""
+        hidden = inputs
+        last = len(self.layers) - 1
+        for i, (weight, bias) in enumerate(self.layers):
+            hidden = hidden @ weight
+            hidden += bias
+            if i < last:
+                np.maximum(hidden, 0.0, out=hidden)
+        return hidden
+
+    def _forward(self, inputs: np.ndarray) -> np.ndarray:
+        """Class probabilities (numerically stable softmax) for a batch of packed inputs"""
+        logits = self.logits(inputs)
+        logits -= logits.max(axis=1, keepdims=True)
+        np.exp(logits, out=logits)
+        logits /= logits.sum(axis=1, keepdims=True)
+        return logits
+
+    def _attribute(self, inputs: np.ndarray, anomaly_probs: np.ndarray) -> np.ndarray:
+        """Per-sensor anomaly scores by leave-one-feature-out occlusion (see ModelInference._attribute)"""
+        n, f = inputs.shape
+        occluded = np.repeat(inputs[:, None, :], f, axis=1)
+        diagonal = np.arange(f)
+        occluded[:, diagonal, diagonal] = 0.0
+
+        occluded_probs = self._forward(occluded.reshape(n * f, f))[:, 1].reshape(n, f)
+        return anomaly_probs[:, None] - occluded_probs
+
+    def anomaly_probabilities(self, inputs: np.ndarray) -> np.ndarray:
+        return self._forward(inputs)[:, 1].copy()
+
+    def predict_packed(self, inputs: np.ndarray) -> List[Dict]:
+        """Score packed model inputs with NumPy"""
+        anomaly_probs = self._forward(inputs)[:, 1]  # index 1 is the anomaly class
+
+        # Attribute flagged frames to sensors in one extra vectorized pass
+        flagged = np.flatnonzero(anomaly_probs > ANOMALY_THRESHOLD)
+        scores = {}
+        if settings.ATTRIBUTION_ENABLED and flagged.size:
+            flagged_scores = self._attribute(inputs[flagged], anomaly_probs[flagged])
+            scores = dict(zip(flagged.tolist(), flagged_scores))
+
+        return self._results(anomaly_probs.tolist(), scores)
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from app.config import settings
+from app.utils.auth import get_password_hash, verify_password
+from app.utils.metrics import metrics
+
+HASH_MS_BUCKETS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+class HasherSaturatedError(Exception):
+    """Raised when the password hashing pool has no free worker or queue slot"""
+
+class PasswordHasher:
+    """
+    Bounded thread pool for bcrypt hashing and verification
+
+    A bcrypt call takes ~250 ms of CPU at cost 12. The bcrypt package
+    releases the GIL while hashing, so running it on these threads keeps
+    the event loop free for prediction traffic during login bursts. At most
+    max_workers hashes run at once (leaving the other cores to inference)
+    and at most max_queue more may wait; beyond that HasherSaturatedError
+    is raised so the route can answer 503 instead of piling up logins.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 64):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._running = 0
+
+        self.running_gauge = metrics.gauge("password_hash_running", "bcrypt operations currently executing")
+        self.queued_gauge = metrics.gauge("password_hash_queued", "bcrypt operations waiting for a worker")
+        self.rejected = metrics.counter("password_hash_rejected_total", "bcrypt operations rejected because the pool was saturated")
+        self.task_ms = metrics.histogram("password_hash_task_ms", HASH_MS_BUCKETS, "bcrypt operation run time")
+        self.wait_ms = metrics.histogram("password_hash_wait_ms", HASH_MS_BUCKETS, "Time a bcrypt operation waited for a worker")
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def _update_gauges(self):
+        self.running_gauge.set(self._running)
+        self.queued_gauge.set(self._in_flight - self._running)
+
+    def _timed(self, fn: Callable, enqueued_at: float, *args):
+        with self._lock:
+            self._running += 1
+            self._update_gauges()
+        started = time.perf_counter()
+        self.wait_ms.observe((started - enqueued_at) * 1000.0)
+        try:
+            return fn(*args)
+        finally:
+            self.task_ms.observe((time.perf_counter() - started) * 1000.0)
+            with self._lock:
+                self._running -= 1
+                self._update_gauges()
+
+    async def run(self, fn: Callable, *args):
+        """Run fn(*args) on the pool, raising HasherSaturatedError when full"""
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self.rejected.inc()
+                raise HasherSaturatedError("Password hashing pool is saturated")
+            self._in_flight += 1
+            self._update_gauges()
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), self._timed, fn, time.perf_counter(), *args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._update_gauges()
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with the configured bcrypt cost"""
+        return await self.run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against a hash"""
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    def stats(self) -> Dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "running": self._running,
+            "queued": self._in_flight - self._running,
+            "rejected": int(self.rejected.value)
+        }
+
+def create_password_hasher() -> PasswordHasher:
+    """Build the password hashing pool from settings"""
+    return PasswordHasher(
+        max_workers=settings.PASSWORD_HASH_WORKERS,
+        max_queue=settings.PASSWORD_HASH_MAX_QUEUE
+    )
+
+# Global password hashing pool
+password_hasher = create_password_hasher()
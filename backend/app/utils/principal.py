@@ -0,0 +1,236 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from starlette.requests import HTTPConnection
+from app.config import settings
+from app.database import SessionLocal
+from app.models import User, UserRole, UserStatus
+from app.utils.admin_cache import RedisCacheBackend, admin_cache
+from app.utils.auth import decode_access_token
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class Principal:
+    """The authenticated user as seen by route dependencies (no ORM session attached)"""
+
+    __slots__ = ("id", "email", "name", "role", "status", "is_active")
+
+    def __init__(self, id: int, email: str, name: str, role: UserRole, status: UserStatus, is_active: bool):
+        self.id = id
+        self.email = email
+        self.name = name
+        self.role = role
+        self.status = status
+        self.is_active = is_active
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(user.id, user.email, user.name, user.role, user.status, bool(user.is_active))
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == UserRole.ADMIN
+
+class PrincipalCache:
+    """
+    TTL caches for the JWT auth fast path
+
+    Decoded tokens are memoized by a digest of the token, so the HMAC
+    signature of a token is verified once per ttl_seconds (and never past
+    its exp). Principals are cached by email, so an authenticated request
+    costs no database query while both entries are fresh. invalidate()
+    must be called whenever a user's role, status or is_active changes.
+
+    With a shared backend (the admin cache's Redis) each user has a
+    generation counter, like AdminCache: principals are stored under the
+    generation they were loaded at, and invalidate() bumps it so every
+    worker reloads on its next request (one Redis GET, no database query).
+    Without one, invalidate() only reaches this process and other workers
+    see the change within ttl_seconds. Backend errors fall back to the
+    database.
+    """
+
+    def __init__(self, ttl_seconds: float = 5.0, max_entries: int = 10000, shared=None, prefix: str = "fyp:auth"):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.shared = shared
+        self.prefix = prefix
+        self._tokens: "OrderedDict[bytes, Tuple[float, Dict]]" = OrderedDict()
+        self._principals: "OrderedDict[str, Tuple[float, Tuple[Optional[str], Principal]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.token_hits = metrics.counter("auth_token_cache_hits_total", "JWTs served from the decoded-token cache")
+        self.token_misses = metrics.counter("auth_token_cache_misses_total", "JWTs whose signature had to be verified")
+        self.principal_hits = metrics.counter("auth_principal_cache_hits_total", "Principals served without a database query")
+        self.principal_misses = metrics.counter("auth_principal_cache_misses_total", "Principals loaded from the database")
+        self.errors = metrics.counter("auth_principal_cache_errors_total", "Shared generation lookups that failed (loaded from the database)")
+
+    def _get(self, entries: OrderedDict, key):
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del entries[key]
+            return None
+        entries.move_to_end(key)
+        return entry[1]
+
+    def _put(self, entries: OrderedDict, key, value, ttl: float):
+        entries[key] = (time.monotonic() + ttl, value)
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def decode(self, token: str) -> Optional[Dict]:
+        """Verified JWT payload, or None for an invalid or expired token"""
+        key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        with self._lock:
+            payload = self._get(self._tokens, key)
+        if payload is not None:
+            if payload.get("exp", 0) > time.time():
+                self.token_hits.inc()
+                return payload
+            with self._lock:
+                self._tokens.pop(key, None)
+            return None
+
+        self.token_misses.inc()
+        payload = decode_access_token(token)
+        if payload is not None:
+            ttl = min(self.ttl_seconds, payload.get("exp", 0) - time.time())
+            if ttl > 0:
+                with self._lock:
+                    self._put(self._tokens, key, payload, ttl)
+        return payload
+
+    def _generation_key(self, email: str) -> str:
+        return f"{self.prefix}:principal:{email}:generation"
+
+    async def get_principal(self, email: str) -> Tuple[Optional[Principal], Optional[str]]:
+        """Cached principal (None on a miss) and the user's generation to store a reload under"""
+        generation = None
+        if self.shared is not None:
+            try:
+                generation = await self.shared.get(self._generation_key(email)) or "0"
+            except Exception as e:
+                self.errors.inc()
+                logger.warning(f"Principal cache backend unavailable, reading from the database: {str(e)}")
+                return None, None
+
+        with self._lock:
+            entry = self._get(self._principals, email)
+        if entry is not None and entry[0] == generation:
+            self.principal_hits.inc()
+            return entry[1], generation
+        return None, generation
+
+    def put_principal(self, principal: Principal, generation: Optional[str] = None):
+        if self.shared is not None and generation is None:
+            # Generation unknown (backend error): an invalidation could not be detected
+            return
+        with self._lock:
+            self._put(self._principals, principal.email, (generation, principal), self.ttl_seconds)
+
+    async def invalidate(self, email: str):
+        """Forget a user's principal so the next request (in every worker sharing the backend) reloads it"""
+        with self._lock:
+            self._principals.pop(email, None)
+        if self.shared is None:
+            return
+        try:
+            await self.shared.incr(self._generation_key(email))
+        except Exception as e:
+            self.errors.inc()
+            logger.error(f"Principal invalidation failed, other workers see it within {self.ttl_seconds}s: {str(e)}")
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+            self._principals.clear()
+
+def _load_principal(email: str) -> Optional[Principal]:
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == email).first()
+        return Principal.from_user(user) if user else None
+    finally:
+        db.close()
+
+def _bearer_token(connection: HTTPConnection) -> Optional[str]:
+    """Token from the Authorization header, or ?token= for EventSource / WebSocket clients"""
+    scheme, _, token = connection.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return token
+    return connection.query_params.get("token")
+
+# Only declares the bearer scheme in the OpenAPI docs; tokens are read by _bearer_token
+bearer_scheme = HTTPBearer(auto_error=False)
+
+async def get_current_principal(connection: HTTPConnection) -> Principal:
+    """Authenticate a request; zero database queries while the caches are warm"""
+    token = _bearer_token(connection)
+    payload = principal_cache.decode(token) if token else None
+    if not payload or not payload.get("sub"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+    email = payload["sub"]
+    principal, generation = await principal_cache.get_principal(email)
+    if principal is None:
+        principal_cache.principal_misses.inc()
+        principal = await run_in_threadpool(_load_principal, email)
+        if principal is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        principal_cache.put_principal(principal, generation)
+
+    if not principal.is_active or principal.status != UserStatus.APPROVED:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Account is inactive"
+        )
+    return principal
+
+async def get_current_admin(
+    connection: HTTPConnection,
+    _credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> Principal:
+    """Authenticate a request and require the admin role"""
+    principal = await get_current_principal(connection)
+    if not principal.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access admin resources"
+        )
+    return principal
+
+async def require_model_auth(connection: HTTPConnection) -> Optional[Principal]:
+    """Router dependency for /model: authenticate only when MODEL_AUTH_REQUIRED is set"""
+    if not settings.MODEL_AUTH_REQUIRED:
+        return None
+    return await get_current_principal(connection)
+
+def create_principal_cache() -> PrincipalCache:
+    """Build the auth caches from settings (invalidations shared through the admin cache's Redis, if any)"""
+    shared = admin_cache.backend if isinstance(admin_cache.backend, RedisCacheBackend) else None
+    return PrincipalCache(
+        ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+        max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+        shared=shared,
+        prefix=f"{settings.ADMIN_CACHE_PREFIX}:auth"
+    )
+
+# Global auth caches
+principal_cache = create_principal_cache()
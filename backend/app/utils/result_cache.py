@@ -0,0 +1,127 @@
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.config import settings
+from app.utils.metrics import metrics
+
+class ResultCache:
+    """
+    Bounded LRU/TTL cache of prediction results for repeated frames
+
+    SWaT sensors hold their values for long stretches, so consecutive
+    frames are often identical. Frames are keyed on a hash of their packed
+    feature vector quantized to `quantum` (in standard deviations), plus the
+    model version, so frames equal after quantization share one forward
+    pass and a model swap can never serve stale verdicts. Entries expire
+    after ttl_seconds and the least recently used ones are evicted beyond
+    max_entries.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 300.0, quantum: float = 0.001):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.quantum = quantum
+        self._entries: "OrderedDict[Tuple[str, bytes], Tuple[float, Dict, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = metrics.counter("result_cache_hits_total", "Frames answered from the result cache")
+        self.misses = metrics.counter("result_cache_misses_total", "Frames that needed a forward pass")
+        self.evictions = metrics.counter("result_cache_evictions_total", "Result cache entries evicted (LRU or expired)")
+        self.entries_gauge = metrics.gauge("result_cache_entries", "Entries in the result cache")
+        self.bytes_gauge = metrics.gauge("result_cache_bytes", "Approximate memory held by result cache entries")
+        self.hit_ratio_gauge = metrics.gauge("result_cache_hit_ratio", "Result cache hits / lookups since start")
+
+    def keys(self, packed: np.ndarray, version: str) -> List[Tuple[str, bytes]]:
+        """Cache keys for a (batch, features) packed array"""
+        quantized = np.rint(packed / self.quantum).astype(np.int64)
+        return [(version, hashlib.blake2b(row.tobytes(), digest_size=16).digest()) for row in quantized]
+
+    @staticmethod
+    def _entry_bytes(key: Tuple[str, bytes], result: Dict) -> int:
+        # Topology renderings are shared with the topology registry, so only
+        # the key and the per-frame anomaly dicts are counted
+        size = sys.getsizeof(key) + sys.getsizeof(key[1]) + sys.getsizeof(result)
+        for anomaly in result["anomalies"]:
+            size += sys.getsizeof(anomaly)
+        return size
+
+    def get_many(self, keys: List[Tuple[str, bytes]]) -> List[Optional[Dict]]:
+        """Cached results (shallow copies) for each key, None for misses"""
+        now = time.monotonic()
+        results: List[Optional[Dict]] = []
+        hits = 0
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(key)
+                    results.append(dict(entry[1]))
+                    hits += 1
+                else:
+                    if entry is not None:
+                        self._remove_locked(key)
+                    results.append(None)
+        self.hits.inc(hits)
+        self.misses.inc(len(keys) - hits)
+        self._update_gauges()
+        return results
+
+    def put(self, key: Tuple[str, bytes], result: Dict):
+        size = self._entry_bytes(key, result)
+        with self._lock:
+            if key in self._entries:
+                self._remove_locked(key, evicted=False)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, result, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries:
+                self._remove_locked(next(iter(self._entries)))
+        self._update_gauges()
+
+    def _remove_locked(self, key, evicted: bool = True):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+        if evicted:
+            self.evictions.inc()
+
+    def clear(self):
+        """Drop every entry (e.g. after a model swap)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        self._update_gauges()
+
+    def _update_gauges(self):
+        lookups = self.hits.value + self.misses.value
+        self.entries_gauge.set(len(self._entries))
+        self.bytes_gauge.set(self._bytes)
+        self.hit_ratio_gauge.set(self.hits.value / lookups if lookups else 0.0)
+
+    def stats(self) -> Dict:
+        lookups = self.hits.value + self.misses.value
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "approx_bytes": self._bytes,
+            "hits": int(self.hits.value),
+            "misses": int(self.misses.value),
+            "hit_ratio": round(self.hits.value / lookups, 4) if lookups else 0.0,
+            "evictions": int(self.evictions.value)
+        }
+
+def create_result_cache() -> Optional[ResultCache]:
+    """Build the result cache from settings (None when disabled)"""
+    if not settings.RESULT_CACHE_ENABLED:
+        return None
+    return ResultCache(
+        max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+        quantum=settings.RESULT_CACHE_QUANTUM
+    )
+
+# Global result cache
+result_cache = create_result_cache()
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+from fastapi import WebSocket, WebSocketDisconnect
+from app.config import settings
+from app.utils.executor import PoolSaturatedError
+from app.utils.feature_schema import invalid_readings
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the inbound frame sequence on a connection
+_END = object()
+
+class StreamSession:
+    """
+    Score a continuous sequence of sensor frames received on one WebSocket
+
+    A reader task parses inbound messages into a bounded per-connection
+    queue; when the queue is full the reader stops pulling from the socket,
+    so a fast producer is throttled by TCP flow control instead of growing
+    server memory. The scoring loop drains the queue in batches, runs one
+    forward pass per batch and sends the verdicts back as they are ready.
+
+    Inbound messages are either one frame or a list of frames:
+        {"stream_id": "P1", "seq": 42, "sensor_data": {"FIT101": 2.4, ...}}
+        {"frames": [{"stream_id": "P1", "seq": 42, "sensor_data": {...}}, ...]}
+
+    predict_fn receives the frames themselves (not just their sensor_data),
+    so a windowed scorer can key its state on stream_id. Frames with
+    non-numeric readings are answered with an error and never queued; a
+    batch whose scoring fails gets one error per frame and the session keeps
+    running.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        predict_fn: Callable[[List[Dict]], Awaitable[List[Dict]]],
+        persist_fn: Callable[[List[Dict]], Awaitable[None]],
+        max_pending: int = 256,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 20.0
+    ):
+        self.websocket = websocket
+        self.predict_fn = predict_fn
+        self.persist_fn = persist_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_pending))
+
+        self.frames_total = metrics.counter("stream_frames_total", "Frames received over /model/stream")
+        self.connections = metrics.gauge("stream_connections", "Open /model/stream connections")
+        self.score_errors = metrics.counter("stream_score_errors_total", "Stream batches whose scoring failed")
+
+    async def run(self):
+        await self.websocket.accept()
+        self.connections.inc()
+        reader = asyncio.create_task(self._read())
+        try:
+            while True:
+                batch = await self._next_batch()
+                if not batch:
+                    break
+                await self._score(batch)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            reader.cancel()
+            self.connections.dec()
+
+    async def _read(self):
+        try:
+            while True:
+                message = await self.websocket.receive_json()
+                frames = message.get("frames", [message]) if isinstance(message, dict) else None
+                if not isinstance(frames, list):
+                    await self.websocket.send_json({"type": "error", "detail": "Expected a frame object or {\"frames\": [...]}"})
+                    continue
+
+                for frame in frames:
+                    if not isinstance(frame, dict) or not isinstance(frame.get("sensor_data"), dict):
+                        await self.websocket.send_json({
+                            "type": "error",
+                            "seq": frame.get("seq") if isinstance(frame, dict) else None,
+                            "detail": "Frame must contain a sensor_data object"
+                        })
+                        continue
+                    invalid = invalid_readings(frame["sensor_data"])
+                    if invalid:
+                        await self.websocket.send_json({
+                            "type": "error",
+                            "seq": frame.get("seq"),
+                            "detail": f"Readings must be numbers: {', '.join(invalid)}"
+                        })
+                        continue
+                    # Blocks when the connection's queue is full (backpressure)
+                    await self.queue.put(frame)
+                    self.frames_total.inc()
+        except (WebSocketDisconnect, RuntimeError, ValueError):
+            pass
+        finally:
+            await self.queue.put(_END)
+
+    async def _next_batch(self) -> Optional[List[Dict]]:
+        first = await self.queue.get()
+        if first is _END:
+            return None
+
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self.queue.get_nowait() if remaining <= 0 else await asyncio.wait_for(self.queue.get(), timeout=remaining)
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+            if item is _END:
+                # Score what we have, then stop on the next call
+                self.queue.put_nowait(_END)
+                break
+            batch.append(item)
+        return batch
+
+    async def _score(self, batch: List[Dict]):
+        while True:
+            try:
+                results = await self.predict_fn(batch)
+                break
+            except PoolSaturatedError:
+                # Keep the frames and retry; the client sees the slowdown
+                await self.websocket.send_json({"type": "busy", "pending": self.queue.qsize() + len(batch)})
+                await asyncio.sleep(0.05)
+            except Exception as e:
+                # Fail only this batch's frames; the connection and queued frames carry on
+                self.score_errors.inc()
+                logger.error(f"Failed to score {len(batch)} stream frames: {str(e)}")
+                for frame in batch:
+                    await self.websocket.send_json({
+                        "type": "error",
+                        "stream_id": frame.get("stream_id"),
+                        "seq": frame.get("seq"),
+                        "detail": "Scoring failed"
+                    })
+                return
+
+        await self.persist_fn(results)
+        await self.websocket.send_json({
+            "type": "verdicts",
+            "results": [
+                {
+                    "stream_id": frame.get("stream_id"),
+                    "seq": frame.get("seq"),
+                    "anomalies": result["anomalies"],
+                    **({"window": result["window"]} if "window" in result else {}),
+                    **({"gated": result["gated"]} if "gated" in result else {})
+                }
+                for frame, result in zip(batch, results)
+            ]
+        })
+
+def create_stream_session(
+    websocket: WebSocket,
+    predict_fn: Callable[[List[Dict]], Awaitable[List[Dict]]],
+    persist_fn: Callable[[List[Dict]], Awaitable[None]]
+) -> StreamSession:
+    """Build a stream session using the configured flow-control limits"""
+    return StreamSession(
+        websocket,
+        predict_fn,
+        persist_fn,
+        max_pending=settings.STREAM_MAX_PENDING,
+        max_batch_size=settings.STREAM_MAX_BATCH_SIZE,
+        max_wait_ms=settings.STREAM_MAX_WAIT_MS
+    )
@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from app.config import settings
+
+NORMAL = "normal"
+ANOMALY = "anomaly"
+
+DEFAULT_TOPOLOGY_PATH = os.path.join(os.path.dirname(__file__), "../..", "config", "swat_topology.json")
+
+class TopologyRegistry:
+    """
+    Plant graph loaded from a topology config file
+
+    Nodes are stored once with a node_id -> index map and an adjacency list
+    over indexes; live node status is a flat array. Both the base (all
+    normal) rendering and the live rendering are cached and only rebuilt
+    when the graph or a node status actually changes, so serving the
+    topology is O(1) and marking anomalies is O(anomalies), not O(nodes).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self.load(path)
+
+    def load(self, path: Optional[str] = None):
+        """(Re)load the graph from a JSON config with "nodes" and "edges" lists"""
+        path = path or self.path or DEFAULT_TOPOLOGY_PATH
+        with open(path) as f:
+            config = json.load(f)
+
+        nodes = [dict(node) for node in config.get("nodes", [])]
+        self._apply_default_layout(nodes)
+        index = {node["id"]: i for i, node in enumerate(nodes)}
+
+        adjacency: List[List[int]] = [[] for _ in nodes]
+        edges = []
+        for edge in config.get("edges", []):
+            source, target = index.get(edge["source"]), index.get(edge["target"])
+            if source is None or target is None:
+                continue
+            adjacency[source].append(target)
+            adjacency[target].append(source)
+            edges.append({"source": edge["source"], "target": edge["target"], **({"kind": edge["kind"]} if "kind" in edge else {})})
+
+        with self._lock:
+            self.path = path
+            self.name = config.get("name", "topology")
+            self.nodes = nodes
+            self.index = index
+            self.adjacency = adjacency
+            self.edges = edges
+            self.status = np.zeros(len(nodes), dtype=np.int8)
+            self.version = 0
+            self._base = self._render_nodes(self.status)
+            self._live: Optional[Dict] = None
+            self._live_json: Optional[bytes] = None
+
+    @staticmethod
+    def _apply_default_layout(nodes: List[Dict], columns: int = 20, spacing: int = 100):
+        """Grid positions for nodes the config does not place explicitly"""
+        position = 0
+        for node in nodes:
+            if "x" not in node or "y" not in node:
+                node["x"] = (position % columns) * spacing
+                node["y"] = (position // columns) * spacing
+                position += 1
+
+    def _render_nodes(self, status: np.ndarray) -> Dict:
+        anomalous = status.astype(bool)
+        return {
+            "nodes": [
+                {**node, "status": ANOMALY if is_anomaly else NORMAL}
+                for node, is_anomaly in zip(self.nodes, anomalous.tolist())
+            ],
+            "edges": self.edges
+        }
+
+    def render(self, anomalous_node_ids: Iterable[str] = ()) -> Dict:
+        """
+        Topology with the given nodes marked as anomalous (e.g. for one prediction)
+
+        With no anomalies the cached base rendering is returned as-is; otherwise
+        only the affected node entries are replaced in a shallow copy.
+        """
+        indexes = [self.index[node_id] for node_id in set(anomalous_node_ids) if node_id in self.index]
+        if not indexes:
+            return self._base
+
+        nodes = list(self._base["nodes"])
+        for i in indexes:
+            nodes[i] = {**nodes[i], "status": ANOMALY}
+        return {"nodes": nodes, "edges": self.edges}
+
+    def set_status(self, node_id: str, status: str) -> bool:
+        """Update a node's live status; returns True if it changed"""
+        i = self.index.get(node_id)
+        if i is None:
+            return False
+
+        value = 1 if status == ANOMALY else 0
+        with self._lock:
+            if self.status[i] == value:
+                return False
+            self.status[i] = value
+            self.version += 1
+            self._live = None
+            self._live_json = None
+        return True
+
+    def neighbors(self, node_id: str) -> List[str]:
+        i = self.index.get(node_id)
+        if i is None:
+            return []
+        return [self.nodes[j]["id"] for j in self.adjacency[i]]
+
+    def _live_locked(self) -> Dict:
+        if self._live is None:
+            self._live = self._render_nodes(self.status) if self.status.any() else self._base
+        return self._live
+
+    def live(self) -> Dict:
+        """Topology with current live statuses (cached until a status changes)"""
+        with self._lock:
+            return self._live_locked()
+
+    def live_json(self) -> bytes:
+        """Serialized live topology (cached until a status changes)"""
+        with self._lock:
+            if self._live_json is None:
+                self._live_json = json.dumps(self._live_locked()).encode("utf-8")
+            return self._live_json
+
+# Global topology registry
+topology_registry = TopologyRegistry(settings.TOPOLOGY_CONFIG_PATH)
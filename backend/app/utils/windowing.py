@@ -0,0 +1,207 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+import numpy as np
+from app.config import settings
+from app.utils.feature_schema import FeatureSchema
+from app.utils.metrics import metrics
+
+class StreamWindow:
+    """
+    Ring buffer of the last `size` packed frames of one data stream
+
+    Running sums of x and x^2 are updated as frames enter and leave the
+    ring, so the rolling mean/variance cost O(features) per frame whatever
+    the window length. They are recomputed from the ring once per lap to
+    keep float error from accumulating.
+    """
+
+    __slots__ = ("size", "frames", "count", "position", "_sum", "_sumsq", "last_seen")
+
+    def __init__(self, size: int, num_features: int):
+        self.size = size
+        self.frames = np.zeros((size, num_features), dtype=np.float32)
+        self.count = 0
+        self.position = 0
+        self._sum = np.zeros(num_features, dtype=np.float64)
+        self._sumsq = np.zeros(num_features, dtype=np.float64)
+        self.last_seen = time.monotonic()
+
+    def push(self, row: np.ndarray):
+        if self.count == self.size:
+            evicted = self.frames[self.position].astype(np.float64)
+            self._sum -= evicted
+            self._sumsq -= evicted * evicted
+        else:
+            self.count += 1
+
+        self.frames[self.position] = row
+        value = row.astype(np.float64)
+        self._sum += value
+        self._sumsq += value * value
+        self.position = (self.position + 1) % self.size
+        self.last_seen = time.monotonic()
+
+        if self.position == 0:
+            filled = self.frames[:self.count].astype(np.float64)
+            self._sum = filled.sum(axis=0)
+            self._sumsq = (filled * filled).sum(axis=0)
+
+    @property
+    def latest(self) -> np.ndarray:
+        return self.frames[(self.position - 1) % self.size]
+
+    @property
+    def oldest(self) -> np.ndarray:
+        return self.frames[self.position if self.count == self.size else 0]
+
+    def mean(self) -> np.ndarray:
+        return (self._sum / max(self.count, 1)).astype(np.float32)
+
+    def variance(self) -> np.ndarray:
+        mean = self._sum / max(self.count, 1)
+        return np.maximum(self._sumsq / max(self.count, 1) - mean * mean, 0.0).astype(np.float32)
+
+    def delta(self) -> np.ndarray:
+        """Change of each feature across the window (slow ramps show up here)"""
+        return self.latest - self.oldest
+
+def rolling_mean(packed: np.ndarray, size: int, warm: int = 0) -> np.ndarray:
+    """
+    Window features for consecutive frames of one stream, all at once
+
+    Row i is the mean of rows max(0, i - size + 1)..i, what StreamWindow
+    returns after pushing them one by one. The first `warm` rows only fill
+    the window (history before the replayed range) and are not returned.
+    """
+    totals = np.cumsum(packed, axis=0, dtype=np.float64)
+    ends = np.arange(warm, packed.shape[0])
+    starts = ends - size
+    window_sums = totals[ends] - np.where(starts[:, None] >= 0, totals[np.maximum(starts, 0)], 0.0)
+    counts = np.minimum(ends + 1, size)[:, None]
+    return (window_sums / counts).astype(np.float32)
+
+class WindowManager:
+    """
+    Per-stream sliding windows for temporal inference
+
+    Frames are packed with the feature schema (so window statistics are in
+    training-standard-deviation units), pushed into their stream's ring and
+    replaced by the window mean as the model input. At most max_streams
+    windows are kept; the least recently used one is evicted first, and
+    streams idle for longer than idle_seconds are dropped.
+    """
+
+    def __init__(
+        self,
+        schema: FeatureSchema,
+        window_size: int = 30,
+        max_streams: int = 1000,
+        idle_seconds: float = 600.0
+    ):
+        self.schema = schema
+        self.window_size = max(1, window_size)
+        self.max_streams = max(1, max_streams)
+        self.idle_seconds = idle_seconds
+        self._windows: "OrderedDict[str, StreamWindow]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.streams_gauge = metrics.gauge("window_streams", "Streams with a live inference window")
+        self.evictions = metrics.counter("window_evictions_total", "Stream windows evicted (LRU or idle)")
+
+    def set_schema(self, schema: FeatureSchema):
+        """Switch to another model's schema; windows are dropped if the normalization differs"""
+        with self._lock:
+            same = (
+                schema.tags == self.schema.tags
+                and np.array_equal(schema.mean, self.schema.mean)
+                and np.array_equal(schema.std, self.schema.std)
+            )
+            self.schema = schema
+            if not same:
+                self._windows.clear()
+                self.streams_gauge.set(0)
+
+    @property
+    def bytes_per_stream(self) -> int:
+        return self.window_size * self.schema.num_features * 4
+
+    def _get(self, stream_id: str) -> StreamWindow:
+        window = self._windows.get(stream_id)
+        if window is None:
+            window = StreamWindow(self.window_size, self.schema.num_features)
+            self._windows[stream_id] = window
+            while len(self._windows) > self.max_streams:
+                self._windows.popitem(last=False)
+                self.evictions.inc()
+        else:
+            self._windows.move_to_end(stream_id)
+        return window
+
+    def evict_idle(self) -> int:
+        """Drop windows not updated within idle_seconds (oldest are at the front)"""
+        cutoff = time.monotonic() - self.idle_seconds
+        evicted = 0
+        with self._lock:
+            while self._windows:
+                stream_id, window = next(iter(self._windows.items()))
+                if window.last_seen >= cutoff:
+                    break
+                del self._windows[stream_id]
+                evicted += 1
+            self.streams_gauge.set(len(self._windows))
+        self.evictions.inc(evicted)
+        return evicted
+
+    def update(self, items: List[Tuple[str, Dict]]) -> Tuple[np.ndarray, List[Dict]]:
+        """
+        Push (stream_id, sensor_data) frames in order and return model inputs
+
+        Returns a (len(items), num_features) array of window means and, for
+        each frame, a summary of its window right after the frame entered it.
+        """
+        packed = self.schema.pack([frame for _, frame in items])
+        features = np.empty_like(packed)
+        summaries = []
+
+        with self._lock:
+            for i, (stream_id, _) in enumerate(items):
+                window = self._get(stream_id)
+                window.push(packed[i])
+                features[i] = window.mean()
+                summaries.append(self.summarize(window))
+            self.streams_gauge.set(len(self._windows))
+
+        self.evict_idle()
+        return features, summaries
+
+    def summarize(self, window: StreamWindow, top_k: int = 5, min_delta: float = 0.5) -> Dict:
+        """Window statistics for a response: the tags drifting the most across the window"""
+        delta = window.delta()
+        std = np.sqrt(window.variance())
+        z = np.divide(window.latest - window.mean(), std, out=np.zeros_like(std), where=std > 1e-6)
+
+        order = np.argsort(-np.abs(delta))[:top_k]
+        return {
+            "frames": window.count,
+            "size": window.size,
+            "drifting": [
+                {
+                    "tag": self.schema.tags[i],
+                    "delta": round(float(delta[i]), 4),
+                    "z": round(float(z[i]), 4)
+                }
+                for i in order
+                if abs(delta[i]) >= min_delta
+            ]
+        }
+
+def create_window_manager(schema: FeatureSchema) -> WindowManager:
+    """Build a window manager using the configured limits"""
+    return WindowManager(
+        schema,
+        window_size=settings.WINDOW_SIZE,
+        max_streams=settings.WINDOW_MAX_STREAMS,
+        idle_seconds=settings.WINDOW_IDLE_SECONDS
+    )
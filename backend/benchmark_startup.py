@@ -0,0 +1,63 @@
+"""
+Script to measure cold-start time of the API
+
+Each scenario runs in a fresh interpreter (so nothing is cached in
+sys.modules) and is repeated a few times; the median is reported together
+with whether torch ended up imported.
+
+    python benchmark_startup.py [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SCENARIOS = {
+    # Login/signup only: config, database and auth routes
+    "auth routes": "import app.routes.auth",
+    # Whole FastAPI app as uvicorn imports it (model not loaded yet)
+    "full app import": "import main",
+    # Whole app plus torch import, checkpoint load and warmup
+    "full app + model load": "import main\nfrom app.utils.model_registry import model_registry\nmodel_registry.ensure_loaded()",
+}
+
+PROBE = """
+import sys, time
+started = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - started
+print(f"{{elapsed * 1000.0:.1f}} {{int('torch' in sys.modules)}}")
+"""
+
+def run_scenario(code: str) -> tuple:
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(code=code)],
+        cwd=backend_dir,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    elapsed_ms, torch_loaded = result.stdout.strip().splitlines()[-1].split()
+    return float(elapsed_ms), torch_loaded == "1"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per scenario")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<24}{'median ms':>12}{'min ms':>10}{'max ms':>10}  torch")
+    for name, code in SCENARIOS.items():
+        timings = []
+        torch_loaded = False
+        for _ in range(args.runs):
+            elapsed_ms, torch_loaded = run_scenario(code)
+            timings.append(elapsed_ms)
+        print(
+            f"{name:<24}{statistics.median(timings):>12.1f}{min(timings):>10.1f}{max(timings):>10.1f}"
+            f"  {'yes' if torch_loaded else 'no'}"
+        )
+
+if __name__ == "__main__":
+    main()
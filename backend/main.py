@@ -1,17 +1,57 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from app.database import engine, Base
 from app.routes import auth, admin, model
 from app.config import settings
+from app.utils.metrics import metrics
+from app.utils.executor import inference_pool
+from app.utils.anomaly_storage import anomaly_storage
+from app.utils.model_registry import model_registry
+from app.utils.admin_cache import admin_cache
+from app.utils.email_dispatcher import email_dispatcher
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
+
+async def preload_model():
+    """Import torch and load the startup checkpoint without holding up startup"""
+    try:
+        await run_in_threadpool(model_registry.ensure_loaded)
+    except Exception as e:
+        logger.error(f"Model preload failed, loading on first prediction instead: {str(e)}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create database tables (at startup rather than at import, so importing
+    # the app stays cheap); anomaly partitions must exist before the first insert
+    app.state.database_ready = False
+    await run_in_threadpool(Base.metadata.create_all, bind=engine)
+    await run_in_threadpool(anomaly_storage.run_maintenance)
+    app.state.database_ready = True
+    anomaly_storage.start(settings.ANOMALY_MAINTENANCE_INTERVAL_SECONDS)
+    if settings.MAIL_DISPATCHER_ENABLED:
+        email_dispatcher.start()
+    
+    if settings.MODEL_PRELOAD:
+        app.state.model_preload = asyncio.create_task(preload_model())
+    yield
+    await anomaly_storage.stop()
+    # Stop batching, release inference workers and drain buffered anomalies on shutdown
+    await model.batcher.stop()
+    inference_pool.shutdown()
+    await model.anomaly_writer.stop()
+    await admin_cache.backend.close()
+    await email_dispatcher.stop()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="FYP IIoT Anomaly Detection System",
     description="Deep Q-Learning + GNN based FDI Attack Detection for IIoT",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -25,6 +65,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include routers
@@ -42,8 +83,28 @@ def read_root():
 
 @app.get("/health")
 def health_check():
+    """Liveness probe: the process is up and serving requests"""
     return {"status": "healthy"}
 
+@app.get("/ready")
+def readiness_check(response: Response):
+    """Readiness probe: database schema created and a model version serving"""
+    active = model_registry.active
+    checks = {
+        "database": getattr(app.state, "database_ready", False),
+        "model": active is not None,
+        "model_version": active.version if active else None
+    }
+    if not (checks["database"] and checks["model"]):
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "starting", **checks}
+    return {"status": "ready", **checks}
+
+@app.get("/metrics")
+def get_metrics():
+    """Snapshot of in-process counters and histograms"""
+    return metrics.snapshot()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,19 @@
+import numpy as np
+from app.utils.feature_schema import FeatureSchema
+
+def make_schema() -> FeatureSchema:
+    return FeatureSchema(tags=["A", "B", "C"], mean=[1.0, 2.0, 3.0], std=[1.0, 2.0, 4.0])
+
+def test_pack_fills_missing_readings_with_the_mean():
+    packed = make_schema().pack([{"A": 3.0, "B": None}])
+    np.testing.assert_allclose(packed, [[2.0, 0.0, 0.0]])
+
+def test_pack_treats_string_readings_as_missing():
+    schema = make_schema()
+    packed = schema.pack([{"A": "abc", "B": "6", "C": 7.0}, {"A": 2.0, "B": 2.0, "C": 3.0}]).copy()
+    np.testing.assert_allclose(packed, [[0.0, 2.0, 1.0], [1.0, 0.0, 0.0]])
+
+def test_pack_treats_list_readings_as_missing():
+    schema = make_schema()
+    packed = schema.pack([{"A": [1.0, 2.0], "B": {"x": 1}, "C": 7.0}, {"A": 2.0}]).copy()
+    np.testing.assert_allclose(packed, [[0.0, 0.0, 1.0], [1.0, 0.0, 0.0]])
@@ -25,7 +25,7 @@ interface SensorData {
 
 interface TopologyNode {
   id: string;
-  type?: 'sensor' | 'plc' | 'hmi' | 'server';
+  type?: 'sensor' | 'actuator' | 'plc' | 'hmi' | 'server';
   name?: string;
   status: 'online' | 'offline' | 'alert' | 'normal' | 'anomaly';
   x?: number;
@@ -44,9 +44,31 @@ export const UserDashboard: React.FC = () => {
 
   useEffect(() => {
     fetchData();
-    // Refresh data every 30 seconds
-    const interval = setInterval(fetchData, 30000);
-    return () => clearInterval(interval);
+    // Apply live deltas pushed by the backend instead of polling
+    const unsubscribe = modelService.subscribeEvents({
+      onAnomaly: (anomaly) => {
+        setRecentAlerts(prev => [
+          {
+            id: anomaly.id,
+            type: 'Anomaly Detected',
+            sensor: anomaly.node_id,
+            time: 'just now',
+            severity: anomaly.severity,
+          },
+          ...prev,
+        ].slice(0, 50));
+      },
+      onAnomalyResolved: (event) => {
+        setRecentAlerts(prev => prev.filter(alert => alert.id !== event.id));
+      },
+      onNodeStatus: (event) => {
+        setTopologyData(prev => prev.map(node =>
+          node.id === event.node_id ? { ...node, status: event.status } : node
+        ));
+      },
+      onResync: fetchData,
+    });
+    return unsubscribe;
   }, []);
 
   const fetchData = async () => {
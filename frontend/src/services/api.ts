@@ -6,7 +6,10 @@ import type {
   User, 
   Anomaly, 
   Topology,
-  Analytics 
+  Analytics,
+  AnomalyResolvedEvent,
+  NodeStatusEvent,
+  ModelEventHandlers
 } from '../types';
 
 const API_URL = 'http://127.0.0.1:8000';
@@ -98,6 +101,41 @@ export const modelService = {
     const response = await api.post('/model/predict', { sensor_data: sensorData });
     return response.data;
   },
+
+  // Live dashboard deltas over Server-Sent Events; returns an unsubscribe function
+  subscribeEvents: (handlers: ModelEventHandlers): (() => void) => {
+    // EventSource cannot send headers, so the token goes in the query string
+    const token = localStorage.getItem('token');
+    const query = token ? `?token=${encodeURIComponent(token)}` : '';
+    const source = new EventSource(`${API_URL}/model/events${query}`);
+    let hadError = false;
+
+    source.onopen = () => {
+      // EventSource reconnects by itself; refetch to cover events missed while down
+      if (hadError) {
+        hadError = false;
+        handlers.onResync?.();
+      }
+    };
+    source.onerror = () => {
+      hadError = true;
+    };
+
+    source.addEventListener('anomaly', (e) => {
+      handlers.onAnomaly?.(JSON.parse((e as MessageEvent).data) as Anomaly);
+    });
+    source.addEventListener('anomaly_resolved', (e) => {
+      handlers.onAnomalyResolved?.(JSON.parse((e as MessageEvent).data) as AnomalyResolvedEvent);
+    });
+    source.addEventListener('node_status', (e) => {
+      handlers.onNodeStatus?.(JSON.parse((e as MessageEvent).data) as NodeStatusEvent);
+    });
+    source.addEventListener('resync', () => {
+      handlers.onResync?.();
+    });
+
+    return () => source.close();
+  },
 };
 
 export default api;
@@ -46,7 +46,7 @@ export interface TopologyNode {
   id: string;
   label?: string;
   name?: string;
-  type?: 'sensor' | 'plc' | 'hmi' | 'server';
+  type?: 'sensor' | 'actuator' | 'plc' | 'hmi' | 'server';
   status: 'normal' | 'anomaly' | 'online' | 'offline' | 'alert';
   x?: number;
   y?: number;
@@ -62,6 +62,23 @@ export interface Topology {
   edges: TopologyEdge[];
 }
 
+export interface AnomalyResolvedEvent {
+  id: number;
+  node_id: string;
+}
+
+export interface NodeStatusEvent {
+  node_id: string;
+  status: TopologyNode['status'];
+}
+
+export interface ModelEventHandlers {
+  onAnomaly?: (anomaly: Anomaly) => void;
+  onAnomalyResolved?: (event: AnomalyResolvedEvent) => void;
+  onNodeStatus?: (event: NodeStatusEvent) => void;
+  onResync?: () => void;
+}
+
 export interface Analytics {
   total_users: number;
   active_users?: number;